@@ -0,0 +1,82 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from orders.models import Order
+from products.models import Brand, Category, Product
+
+
+class Command(BaseCommand):
+    help = ('Seed a large dataset and report EXPLAIN plans and timings for the hot catalog/order queries. '
+            'The seeded rows are rolled back afterwards unless --keep is given.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=50000)
+        parser.add_argument('--orders', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--no-seed', action='store_true', help='Use the data already in the database')
+        parser.add_argument('--keep', action='store_true',
+                            help='Commit the seeded rows instead of rolling them back; re-runs add more orders')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if not options['no_seed']:
+                call_command('populate_sample_data', products=options['products'], users=options['users'],
+                             orders=options['orders'], seed=options['seed'], stdout=self.stdout)
+                # Planner statistics for the seeded rows, which other connections never see
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+            self.benchmark(options)
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def benchmark(self, options):
+        category = Category.objects.order_by('id').first()
+        brand = Brand.objects.order_by('id').first()
+        user = Order.objects.values_list('user_id', flat=True).first()
+        since = timezone.now() - timedelta(days=30)
+
+        queries = [
+            ('product list', Product.objects.filter(is_active=True).order_by('-created_at')[:12]),
+            ('product list by category', Product.objects.filter(
+                is_active=True, category=category).order_by('-created_at')[:12]),
+            ('product list by brand', Product.objects.filter(
+                is_active=True, brand=brand).order_by('-created_at')[:12]),
+            ('featured products', Product.objects.filter(
+                is_active=True, is_featured=True).order_by('-created_at')[:8]),
+            ('product list by price', Product.objects.filter(
+                is_active=True, effective_price__lte=50000).order_by('effective_price')[:12]),
+            ('low stock count', Product.objects.filter(stock_quantity__lte=5).order_by()),
+            ('order history', Order.objects.filter(user_id=user).order_by('-created_at')[:12]),
+            ('pending orders', Order.objects.filter(status='pending').order_by()),
+            ('paid revenue', Order.objects.filter(payment_status='paid').order_by()),
+            ('orders last 30 days', Order.objects.filter(created_at__gte=since).order_by()),
+        ]
+
+        self.stdout.write(f'Database: {connection.vendor}, '
+                          f'{Product.objects.count()} products, {Order.objects.count()} orders\n')
+        for name, queryset in queries:
+            if name == 'paid revenue':
+                run = lambda qs=queryset: qs.aggregate(total=Sum('final_amount'))
+            elif queryset.query.is_sliced:
+                run = lambda qs=queryset: list(qs.all())
+            else:
+                run = lambda qs=queryset: qs.count()
+
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - start) * 1000)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(queryset.explain())
+            self.stdout.write(f'median {statistics.median(timings):.2f} ms, '
+                              f'max {max(timings):.2f} ms over {len(timings)} runs\n')
@@ -1,18 +1,25 @@
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db.models import Count, Sum, Q
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 from products.models import Product, Category, Brand
 from orders.models import Order, OrderItem
 from products.serializers import ProductListSerializer
 from orders.serializers import OrderSerializer
 from users.serializers import UserProfileSerializer
+from utils.pagination import CatalogPagination
 
 User = get_user_model()
 
+def start_of_day(day):
+    """Datetime bound for `day`, so date filters can use the created_at index instead of __date"""
+    start = datetime.combine(day, time.min)
+    return timezone.make_aware(start) if settings.USE_TZ else start
+
 class IsAdminUser(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user and request.user.is_authenticated and request.user.user_type == 'admin'
@@ -22,7 +29,7 @@ class AdminDashboardView(generics.GenericAPIView):
     
     def get(self, request):
         # Get dashboard statistics
-        today = timezone.now().date()
+        today = timezone.localdate() if settings.USE_TZ else timezone.now().date()
         last_30_days = today - timedelta(days=30)
         
         stats = {
@@ -31,8 +38,8 @@ class AdminDashboardView(generics.GenericAPIView):
             'total_orders': Order.objects.count(),
             'total_revenue': Order.objects.filter(payment_status='paid').aggregate(
                 total=Sum('final_amount'))['total'] or 0,
-            'orders_today': Order.objects.filter(created_at__date=today).count(),
-            'orders_this_month': Order.objects.filter(created_at__date__gte=last_30_days).count(),
+            'orders_today': Order.objects.filter(created_at__gte=start_of_day(today)).count(),
+            'orders_this_month': Order.objects.filter(created_at__gte=start_of_day(last_30_days)).count(),
             'low_stock_products': Product.objects.filter(stock_quantity__lte=5).count(),
             'pending_orders': Order.objects.filter(status='pending').count(),
         }
@@ -53,14 +60,16 @@ class AdminDashboardView(generics.GenericAPIView):
         })
 
 class AdminProductListView(generics.ListAPIView):
-    queryset = Product.objects.all()
+    queryset = Product.objects.for_listing()
     serializer_class = ProductListSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = CatalogPagination
 
 class AdminOrderListView(generics.ListAPIView):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = CatalogPagination
 
 class AdminOrderDetailView(generics.RetrieveUpdateAPIView):
     queryset = Order.objects.all()
@@ -81,7 +90,7 @@ class AdminAnalyticsView(generics.GenericAPIView):
         last_30_days = timezone.now().date() - timedelta(days=30)
         
         daily_sales = Order.objects.filter(
-            created_at__date__gte=last_30_days,
+            created_at__gte=start_of_day(last_30_days),
             payment_status='paid'
         ).extra(
             select={'day': 'date(created_at)'}
@@ -0,0 +1,14 @@
+"""
+ASGI entry point, e.g. `uvicorn config.asgi:application --workers 4`.
+
+Payment views run as async views here (ASYNC_PAYMENT_VIEWS); everything
+else runs as before, in Django's thread pool.
+"""
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('ASYNC_PAYMENT_VIEWS', '1')
+
+application = get_asgi_application()
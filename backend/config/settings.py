@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 
 load_dotenv()
 
@@ -37,6 +38,7 @@ INSTALLED_APPS = [
     'orders',
     'admin_panel',
     'payments',
+    'jobs',
 ]
 
 TEMPLATES = [
@@ -104,6 +106,8 @@ DEBUG = True
 ROOT_URLCONF = "config.urls"
  
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'x-cart-token')
+CORS_EXPOSE_HEADERS = ['X-Cart-Token']
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -112,6 +116,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Generated invoice PDFs (orders/invoices.py); private, not served as media
+INVOICE_STORAGE_ROOT = BASE_DIR / 'invoices'
+
 # Static Files
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
@@ -139,3 +146,81 @@ STRIPE_SECRET_KEY = 'sk_test_your_stripe_secret_key'
 RAZORPAY_KEY_ID = 'your_razorpay_key_id'
 RAZORPAY_KEY_SECRET = 'your_razorpay_key_secret'
 
+# Signing secrets for /api/payments/webhooks/stripe/ and .../razorpay/
+STRIPE_WEBHOOK_SECRET = 'whsec_your_stripe_webhook_secret'
+RAZORPAY_WEBHOOK_SECRET = 'your_razorpay_webhook_secret'
+
+# Gateway HTTP clients (see payments/clients.py). Each process keeps one
+# pooled keep-alive session per gateway. After PAYMENT_CIRCUIT_FAILURES
+# connection errors, timeouts or 5xx responses in a row, calls fail fast with
+# a 503 for PAYMENT_CIRCUIT_RESET seconds. Point the *_API_BASE variables at
+# `manage.py run_fake_gateway` to test against a local stub.
+PAYMENT_CONNECT_TIMEOUT = 3.05
+PAYMENT_READ_TIMEOUT = 15
+PAYMENT_POOL_SIZE = 10
+PAYMENT_CIRCUIT_FAILURES = 5
+PAYMENT_CIRCUIT_RESET = 30
+STRIPE_API_BASE = os.getenv('STRIPE_API_BASE')
+RAZORPAY_API_BASE = os.getenv('RAZORPAY_API_BASE')
+
+# ASGI deployment (config/asgi.py, e.g. `uvicorn config.asgi:application`).
+# With ASYNC_PAYMENT_VIEWS, which config/asgi.py turns on, the four payment
+# views run as async views (payments/async_views.py) calling the gateways with
+# httpx, so waiting on a gateway no longer holds a worker. One event loop has
+# up to PAYMENT_ASYNC_POOL_SIZE gateway connections open.
+ASGI_APPLICATION = 'config.asgi.application'
+ASYNC_PAYMENT_VIEWS = os.getenv('ASYNC_PAYMENT_VIEWS') == '1'
+PAYMENT_ASYNC_POOL_SIZE = 100
+
+# Idempotency-Key support on payment confirmation (see payments/idempotency.py).
+# Stored responses are replayed for IDEMPOTENCY_KEY_TTL seconds and removed by
+# `manage.py purge_idempotency_keys`; a key whose first request has not
+# finished is retried after IDEMPOTENCY_LOCK_TIMEOUT seconds.
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+
+# Product full-text search (see products/search.py). Left unset, FTS5 is used
+# on SQLite and a tsvector/GIN index on Postgres.
+# PRODUCT_SEARCH_BACKEND = 'products.search.SQLiteFTS5Backend'
+
+# Caching. Set CACHE_URL (e.g. redis://127.0.0.1:6379/1, needs the `redis`
+# package) to share the cache between workers; without it each process keeps
+# its own local-memory cache, which is what tests and local runs use.
+CACHE_URL = os.getenv('CACHE_URL')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_URL,
+    } if CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+PRODUCT_CACHE_ALIAS = 'default'
+PRODUCT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Where carts live: 'database' (Cart/CartItem rows, the default) or 'cache'.
+# With 'cache', cart edits only touch the cache, anonymous visitors get carts
+# (X-Cart-Token header) that are merged on login, and `manage.py flush_carts`
+# must run every minute or so to write changed carts to the database. Needs a
+# cache shared by all processes, i.e. CACHE_URL.
+CART_STORE = os.getenv('CART_STORE', 'database')
+CART_CACHE_ALIAS = 'default'
+CART_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+# How long stock reserved for a cart in checkout is held (seconds). Expired
+# reservations are returned to stock by `manage.py release_expired_reservations`.
+STOCK_RESERVATION_TTL = 15 * 60
+
+# Background jobs (see jobs/queue.py), processed by `manage.py run_worker`.
+# A failed job is retried after JOBS_RETRY_BACKOFF seconds, doubling up to
+# JOBS_RETRY_BACKOFF_MAX, and marked dead after JOBS_MAX_ATTEMPTS tries.
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_BACKOFF = 30
+JOBS_RETRY_BACKOFF_MAX = 60 * 60
+JOBS_LOCK_TIMEOUT = 10 * 60
+
+# Printed before amounts on invoice PDFs. Invoices use the standard PDF fonts,
+# which have no rupee glyph: '₹' prints as an empty box and sends every amount
+# through ReportLab's slow font-fallback path.
+INVOICE_CURRENCY_PREFIX = 'Rs. '
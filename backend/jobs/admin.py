@@ -0,0 +1,19 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Job
+
+
+@admin.action(description='Requeue selected jobs')
+def requeue(modeladmin, request, queryset):
+    queryset.exclude(status='running').update(
+        status='queued', attempts=0, run_at=timezone.now(), last_error=''
+    )
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('locked_at', 'locked_by', 'last_error', 'created_at', 'finished_at')
+    actions = [requeue]
+
+admin.site.register(Job, JobAdmin)
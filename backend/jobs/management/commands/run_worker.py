@@ -0,0 +1,43 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from jobs.queue import claim_jobs, run_job, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Process background jobs from the database queue until stopped (SIGINT/SIGTERM)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when no job is due')
+        parser.add_argument('--batch-size', type=int, default=10)
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        worker = worker_name()
+        done = failed = 0
+        self.stdout.write(f'Worker {worker} started')
+        while not self.stopping:
+            close_old_connections()
+            jobs = claim_jobs(worker, options['batch_size'])
+            if not jobs:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+            for job in jobs:
+                # Jobs already claimed are finished even when stopping
+                if run_job(job):
+                    done += 1
+                else:
+                    failed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker} stopped: {done} done, {failed} failed'))
+
+    def stop(self, signum, frame):
+        self.stopping = True
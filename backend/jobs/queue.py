@@ -0,0 +1,104 @@
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+
+
+def task(name=None, max_attempts=None):
+    """Register a function as a job; it is called with the job payload as keyword arguments"""
+    def decorator(func):
+        func.task_name = name or f'{func.__module__}.{func.__name__}'
+        func.max_attempts = max_attempts or settings.JOBS_MAX_ATTEMPTS
+        _tasks[func.task_name] = func
+        return func
+    return decorator
+
+
+def enqueue(func, payload=None, run_at=None):
+    """
+    Queue `func` (a @task) to run in the worker. Inside a transaction the job
+    row is written as part of it, so workers only see it once the transaction
+    commits, and never for one that rolls back.
+    """
+    return Job.objects.create(
+        name=func.task_name,
+        payload=payload or {},
+        max_attempts=func.max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter: base, 2 x base, 4 x base ... up to the cap"""
+    delay = min(settings.JOBS_RETRY_BACKOFF * 2 ** (attempts - 1), settings.JOBS_RETRY_BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_jobs(worker, limit):
+    """
+    Mark up to `limit` due jobs as running for `worker`. Each job is claimed
+    with a conditional UPDATE, so two workers can never take the same job;
+    jobs left running by a worker that died are picked up again once their
+    lock is older than JOBS_LOCK_TIMEOUT, or marked dead if that was their
+    last attempt.
+    """
+    now = timezone.now()
+    stale = Q(status='running', locked_at__lt=now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT))
+    abandoned = Job.objects.filter(stale, attempts__gte=F('max_attempts')).update(
+        status='dead', locked_at=None, finished_at=now,
+        last_error='The worker running the last attempt stopped before it finished'
+    )
+    if abandoned:
+        logger.warning('%s jobs were abandoned on their last attempt and marked dead', abandoned)
+
+    due = Q(status='queued', run_at__lte=now) | (stale & Q(attempts__lt=F('max_attempts')))
+    candidates = Job.objects.filter(due).order_by('run_at').values_list('pk', flat=True)[:limit * 2]
+
+    claimed = []
+    for pk in candidates:
+        if Job.objects.filter(due, pk=pk).update(
+            status='running', locked_at=now, locked_by=worker, attempts=F('attempts') + 1
+        ):
+            claimed.append(pk)
+            if len(claimed) == limit:
+                break
+    return list(Job.objects.filter(pk__in=claimed).order_by('run_at'))
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome; returns True on success"""
+    # Only write back while the job is still ours (the lock may have expired)
+    ours = Job.objects.filter(pk=job.pk, status='running', locked_by=job.locked_by, locked_at=job.locked_at)
+    func = _tasks.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f'No task registered as {job.name!r}')
+        func(**job.payload)
+    except Exception:
+        logger.exception('Job %s (%s) failed on attempt %s', job.pk, job.name, job.attempts)
+        error = traceback.format_exc()
+        if func is None or job.attempts >= job.max_attempts:
+            ours.update(status='dead', last_error=error, locked_at=None, finished_at=timezone.now())
+        else:
+            ours.update(status='queued', last_error=error, locked_at=None,
+                        run_at=timezone.now() + retry_delay(job.attempts))
+        return False
+
+    ours.update(status='done', locked_at=None, finished_at=timezone.now())
+    return True
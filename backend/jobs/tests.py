@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Job
+from .queue import claim_jobs
+
+
+class AbandonedJobTests(TestCase):
+    """Jobs whose worker died mid-run, leaving them `running` with an expired lock"""
+
+    def abandoned_job(self, attempts, max_attempts=3):
+        expired = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT + 60)
+        return Job.objects.create(name='tests.crash', status='running', attempts=attempts,
+                                  max_attempts=max_attempts, locked_at=expired, locked_by='gone:1')
+
+    def test_reclaimed_while_attempts_remain(self):
+        job = self.abandoned_job(attempts=1)
+        self.assertEqual([claimed.pk for claimed in claim_jobs('worker:2', 10)], [job.pk])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), ('running', 2, 'worker:2'))
+
+    def test_dead_after_last_attempt(self):
+        job = self.abandoned_job(attempts=3)
+        self.assertEqual(claim_jobs('worker:2', 10), [])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('dead', 3))
+        self.assertIsNone(job.locked_at)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_running_job_with_live_lock_is_left_alone(self):
+        job = Job.objects.create(name='tests.slow', status='running', attempts=3, max_attempts=3,
+                                 locked_at=timezone.now(), locked_by='alive:1')
+        self.assertEqual(claim_jobs('worker:2', 10), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'running')
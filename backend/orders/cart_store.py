@@ -0,0 +1,308 @@
+import logging
+import re
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import BasePermission
+from products.models import Product
+
+from .models import Cart, CartItem
+
+logger = logging.getLogger(__name__)
+
+CART_TOKEN_HEADER = 'X-Cart-Token'
+DIRTY_SEQUENCE_KEY = 'cart:dirty:seq'
+DIRTY_CURSOR_KEY = 'cart:dirty:flushed'
+# Seconds an edit waits for the cart lock, and how long a lock outlives a crashed holder
+LOCK_TIMEOUT = 5
+LOCK_EXPIRY = 30
+
+_TOKEN_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class CartBusy(APIException):
+    """Another request held the cart's lock for longer than LOCK_TIMEOUT"""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The cart is being changed by another request, try again.'
+    default_code = 'cart_busy'
+
+
+class CacheCartStore:
+    """
+    Carts kept in the cache and written to Cart/CartItem later.
+
+    A cart is stored under `cart:<owner>` (owner is `user:<id>`, or
+    `anon:<token>` for visitors who are not logged in) as its lines,
+    {product_id: {'quantity', 'added_at'}}, plus a random version token that
+    changes with every edit. `cart:<owner>:persisted` holds the version last
+    written to the database, so a cart is dirty while the two differ.
+
+    Every edit of a user's cart is appended to a log of cache keys numbered
+    with cache.incr(); flush_dirty() (the `flush_carts` command) persists the
+    carts named in the log since its last run. Run it every minute or so:
+    carts stay cached for CART_CACHE_TIMEOUT, far longer, so they are written
+    long before they expire. Checkout flushes the user's cart first.
+
+    The cache must be shared by every process (Redis), not the local-memory
+    default.
+    """
+
+    def __init__(self, alias, timeout):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(self, owner):
+        return f'cart:{owner}'
+
+    def persisted_key(self, owner):
+        return f'cart:{owner}:persisted'
+
+    @contextmanager
+    def lock(self, owner):
+        """
+        Serialize edits and flushes of one cart; the cache has no compare-and-set.
+        Raises CartBusy if the lock is not free within LOCK_TIMEOUT.
+        """
+        key = f'cart:{owner}:lock'
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while not self.cache.add(key, token, LOCK_EXPIRY):
+            if time.monotonic() >= deadline:
+                raise CartBusy()
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            # Only our own lock: if it expired, another request may hold the key now
+            if self.cache.get(key) == token:
+                self.cache.delete(key)
+
+    def load(self, owner):
+        entry = self.cache.get(self.key(owner))
+        if entry is None:
+            entry = self.read_database(owner)
+            # add(), not set(): an edit may have stored a newer cart since the get() above
+            if self.cache.add(self.key(owner), entry, self.timeout):
+                self.cache.set(self.persisted_key(owner), entry['version'], self.timeout)
+            else:
+                entry = self.cache.get(self.key(owner)) or entry
+        return entry
+
+    def read_database(self, owner):
+        entry = {'lines': {}, 'version': uuid.uuid4().hex, 'cart_id': None,
+                 'created_at': None, 'updated_at': None}
+        if not owner.startswith('user:'):
+            return entry
+        cart = Cart.objects.filter(user_id=owner.split(':')[1]).first()
+        if cart is not None:
+            entry.update(cart_id=cart.pk, created_at=cart.created_at, updated_at=cart.updated_at)
+            entry['lines'] = {
+                product_id: {'quantity': quantity, 'added_at': added_at}
+                for product_id, quantity, added_at in cart.items.values_list('product_id', 'quantity', 'added_at')
+            }
+        return entry
+
+    def edit(self, owner, change):
+        """Apply `change(lines)` to the cart; returns what `change` returns"""
+        with self.lock(owner):
+            entry = self.load(owner)
+            result = change(entry['lines'])
+            if result is not False:
+                entry['version'] = uuid.uuid4().hex
+                entry['updated_at'] = timezone.now()
+                self.cache.set(self.key(owner), entry, self.timeout)
+        if result is not False and owner.startswith('user:'):
+            self.mark_dirty(owner)
+        return result
+
+    def mark_dirty(self, owner):
+        self.cache.add(DIRTY_SEQUENCE_KEY, 0, None)
+        sequence = self.cache.incr(DIRTY_SEQUENCE_KEY)
+        self.cache.set(f'cart:dirty:{sequence}', owner, self.timeout)
+
+    def add(self, owner, product_id, quantity):
+        def change(lines):
+            if product_id in lines:
+                lines[product_id]['quantity'] += quantity
+            else:
+                lines[product_id] = {'quantity': quantity, 'added_at': timezone.now()}
+        self.edit(owner, change)
+
+    def set_quantity(self, owner, product_id, quantity):
+        def change(lines):
+            if product_id not in lines:
+                return False
+            lines[product_id]['quantity'] = quantity
+        return self.edit(owner, change) is not False
+
+    def remove(self, owner, product_id):
+        def change(lines):
+            if lines.pop(product_id, None) is None:
+                return False
+        return self.edit(owner, change) is not False
+
+    def merge(self, token, user):
+        """Move an anonymous cart into the user's cart, adding up quantities"""
+        anonymous = self.cache.get(self.key(f'anon:{token}'))
+        if not anonymous or not anonymous['lines']:
+            return
+
+        def change(lines):
+            for product_id, line in anonymous['lines'].items():
+                if product_id in lines:
+                    lines[product_id]['quantity'] += line['quantity']
+                else:
+                    lines[product_id] = line
+        self.edit(user_owner(user), change)
+        self.cache.delete(self.key(f'anon:{token}'))
+
+    def cart_data(self, owner):
+        """The CartSerializer payload, built from the cached lines and one product query"""
+        from .serializers import CartItemSerializer
+
+        entry = self.load(owner)
+        lines = entry['lines']
+        products = {}
+        if lines:
+            products = {product.pk: product for product in Product.objects.filter(pk__in=lines).for_listing()}
+
+        # Line ids are product ids here, and cart/update|remove/<id>/ take the product id
+        items = sorted((
+            CartItem(id=product_id, cart_id=entry['cart_id'], product=products[product_id],
+                     quantity=line['quantity'], added_at=line['added_at'])
+            for product_id, line in lines.items() if product_id in products
+        ), key=lambda item: item.added_at)
+
+        timestamp = serializers.DateTimeField()
+        return {
+            'id': entry['cart_id'],
+            'items': CartItemSerializer(items, many=True).data,
+            'total_items': len(items),
+            'total_amount': sum(item.total_price for item in items),
+            'created_at': timestamp.to_representation(entry['created_at']) if entry['created_at'] else None,
+            'updated_at': timestamp.to_representation(entry['updated_at']) if entry['updated_at'] else None,
+            'user': int(owner.split(':')[1]) if owner.startswith('user:') else None,
+        }
+
+    def flush(self, owner):
+        """
+        Write the cart to Cart/CartItem if it changed since the last write.
+        Holds the cart lock, so edits and other flushes of the cart wait and
+        `persisted` always names the version in the database.
+        """
+        with self.lock(owner):
+            entry = self.cache.get(self.key(owner))
+            if entry is None or entry['version'] == self.cache.get(self.persisted_key(owner)):
+                return False
+
+            lines = entry['lines']
+            existing = set(Product.objects.filter(pk__in=lines).values_list('pk', flat=True))
+            with transaction.atomic():
+                cart, created = Cart.objects.get_or_create(user_id=owner.split(':')[1])
+                CartItem.objects.filter(cart=cart).exclude(product_id__in=existing).delete()
+                CartItem.objects.bulk_create(
+                    [CartItem(cart=cart, product_id=product_id, quantity=lines[product_id]['quantity'])
+                     for product_id in existing],
+                    update_conflicts=True, unique_fields=['cart', 'product'], update_fields=['quantity']
+                )
+            if entry['cart_id'] is None:
+                entry.update(cart_id=cart.pk, created_at=cart.created_at)
+                self.cache.set(self.key(owner), entry, self.timeout)
+            self.cache.set(self.persisted_key(owner), entry['version'], self.timeout)
+        return True
+
+    def flush_dirty(self, batch_size=500):
+        """Persist every cart edited since the last call; returns how many were written"""
+        sequence = self.cache.get(DIRTY_SEQUENCE_KEY) or 0
+        cursor = self.cache.get(DIRTY_CURSOR_KEY) or 0
+        if cursor > sequence:
+            cursor = 0  # the sequence was evicted and started again
+
+        flushed = 0
+        for start in range(cursor + 1, sequence + 1, batch_size):
+            end = min(start + batch_size, sequence + 1)
+            keys = [f'cart:dirty:{number}' for number in range(start, end)]
+            for owner in set(self.cache.get_many(keys).values()):
+                try:
+                    flushed += self.flush(owner)
+                except CartBusy:
+                    # Its log entry is dropped below; log it again for the next run
+                    self.mark_dirty(owner)
+            self.cache.delete_many(keys)
+            self.cache.set(DIRTY_CURSOR_KEY, end - 1, None)
+        return flushed
+
+    def clear(self, owner):
+        """Empty the cached cart after checkout removed its database rows"""
+        try:
+            with self.lock(owner):
+                entry = self.load(owner)
+                entry.update(lines={}, version=uuid.uuid4().hex, updated_at=timezone.now())
+                self.cache.set(self.key(owner), entry, self.timeout)
+                self.cache.set(self.persisted_key(owner), entry['version'], self.timeout)
+        except CartBusy:
+            # The order is placed already; the next read loads the emptied cart from the database
+            self.cache.delete_many([self.key(owner), self.persisted_key(owner)])
+
+
+def get_cart_store():
+    """The cache cart store when CART_STORE = 'cache', else None (carts live in the database)"""
+    if getattr(settings, 'CART_STORE', 'database') != 'cache':
+        return None
+    return CacheCartStore(settings.CART_CACHE_ALIAS, settings.CART_CACHE_TIMEOUT)
+
+
+def user_owner(user):
+    return f'user:{user.pk}'
+
+
+def cart_owner(request):
+    """Cart owner for the request and, for anonymous visitors, their cart token"""
+    if request.user.is_authenticated:
+        return user_owner(request.user), None
+    token = request.headers.get(CART_TOKEN_HEADER, '')
+    if not _TOKEN_RE.match(token):
+        token = uuid.uuid4().hex
+    return f'anon:{token}', token
+
+
+def flush_user_cart(user):
+    store = get_cart_store()
+    if store is not None:
+        store.flush(user_owner(user))
+
+
+def clear_user_cart(user):
+    store = get_cart_store()
+    if store is not None:
+        store.clear(user_owner(user))
+
+
+def merge_anonymous_cart(request, user):
+    """On login, fold the visitor's anonymous cart (X-Cart-Token) into their own"""
+    store = get_cart_store()
+    token = request.headers.get(CART_TOKEN_HEADER, '')
+    if store is not None and _TOKEN_RE.match(token):
+        try:
+            store.merge(token, user)
+        except CartBusy:
+            # Logging in matters more; the anonymous cart is kept and merged at the next login
+            logger.warning('Cart of user %s was busy, anonymous cart %s not merged', user.pk, token)
+
+
+class CartPermission(BasePermission):
+    """Logged-in users; anonymous visitors too when carts live in the cache"""
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated) or get_cart_store() is not None
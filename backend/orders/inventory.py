@@ -0,0 +1,144 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, Value, When
+from django.utils import timezone
+from products.cache import invalidate_stock
+from products.models import Product
+
+from .models import StockReservation
+
+CLAIM_ATTEMPTS = 5
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f'Insufficient stock for products {self.product_ids}')
+
+
+class ReservationConflict(Exception):
+    pass
+
+
+def quantity_case(quantities):
+    return Case(
+        *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=PositiveIntegerField()
+    )
+
+
+def decrement_stock(quantities):
+    """
+    Take `quantities` ({product_id: quantity}) out of stock with a single
+    conditional UPDATE. Either every product has enough stock and all rows
+    are decremented, or nothing is and InsufficientStock is raised.
+    """
+    if not quantities:
+        return
+    has_stock = Q()
+    for product_id, quantity in quantities.items():
+        has_stock |= Q(pk=product_id, stock_quantity__gte=quantity)
+
+    with transaction.atomic():
+        updated = Product.objects.filter(has_stock).update(
+            stock_quantity=F('stock_quantity') - quantity_case(quantities)
+        )
+        if updated != len(quantities):
+            transaction.set_rollback(True)
+
+    if updated != len(quantities):
+        available = Product.objects.filter(pk__in=quantities).values_list('pk', 'stock_quantity')
+        enough = {pk for pk, stock in available if stock >= quantities[pk]}
+        raise InsufficientStock(set(quantities) - enough)
+
+    transaction.on_commit(lambda: invalidate_stock(list(quantities)))
+
+
+def restock(quantities):
+    """Put `quantities` back into stock with a single UPDATE"""
+    if not quantities:
+        return
+    Product.objects.filter(pk__in=quantities).update(
+        stock_quantity=F('stock_quantity') + quantity_case(quantities)
+    )
+    transaction.on_commit(lambda: invalidate_stock(list(quantities)))
+
+
+def claim_reservations(queryset):
+    """
+    Delete the reservations in `queryset` and return the quantities they held
+    per product. A reservation can be claimed once: if another transaction
+    (checkout or the expiry job) deletes some of the rows first, the claim is
+    rolled back and retried on what is left.
+    """
+    for _ in range(CLAIM_ATTEMPTS):
+        with transaction.atomic():
+            rows = list(queryset.select_for_update().values_list('pk', 'product_id', 'quantity'))
+            deleted, _ = StockReservation.objects.filter(pk__in=[row[0] for row in rows]).delete()
+            if deleted == len(rows):
+                held = Counter()
+                for _, product_id, quantity in rows:
+                    held[product_id] += quantity
+                return held
+            transaction.set_rollback(True)
+    raise ReservationConflict('Stock reservations kept changing while being claimed')
+
+
+@transaction.atomic
+def reserve_stock(cart, quantities, ttl=None):
+    """
+    Hold `quantities` for `cart` until the reservation expires, replacing
+    anything the cart held before. Raises InsufficientStock and keeps the
+    previous reservation if the stock is not there.
+    """
+    ttl = ttl or timedelta(seconds=settings.STOCK_RESERVATION_TTL)
+    held = claim_reservations(StockReservation.objects.filter(cart=cart))
+
+    # Only the difference from what the cart already holds touches the stock
+    wanted = Counter(quantities)
+    wanted.subtract(held)
+    decrement_stock({pk: quantity for pk, quantity in wanted.items() if quantity > 0})
+    restock({pk: -quantity for pk, quantity in wanted.items() if quantity < 0})
+
+    expires_at = timezone.now() + ttl
+    return StockReservation.objects.bulk_create([
+        StockReservation(cart=cart, product_id=product_id, quantity=quantity, expires_at=expires_at)
+        for product_id, quantity in quantities.items() if quantity > 0
+    ])
+
+
+@transaction.atomic
+def take_stock(cart, quantities):
+    """
+    Take `quantities` out of stock for an order. Units the cart has reserved
+    are used first, even if the reservation expired but was not released
+    yet; only the rest is decremented, and any surplus is put back.
+    """
+    held = claim_reservations(StockReservation.objects.filter(cart=cart))
+    needed = Counter(quantities)
+    needed.subtract(held)
+    decrement_stock({pk: quantity for pk, quantity in needed.items() if quantity > 0})
+    restock({pk: -quantity for pk, quantity in needed.items() if quantity < 0})
+
+
+@transaction.atomic
+def release_reservations(cart):
+    restock(claim_reservations(StockReservation.objects.filter(cart=cart)))
+
+
+def release_expired(now=None, batch_size=500):
+    """Put the stock of expired reservations back; returns the number of units released"""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        batch = StockReservation.objects.filter(expires_at__lte=now).order_by('expires_at')[:batch_size]
+        with transaction.atomic():
+            ids = list(batch.values_list('pk', flat=True))
+            if not ids:
+                return released
+            held = claim_reservations(StockReservation.objects.filter(pk__in=ids))
+            restock(held)
+        released += sum(held.values())
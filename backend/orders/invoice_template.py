@@ -0,0 +1,167 @@
+"""
+Invoice PDF layout drawn straight onto a ReportLab canvas.
+
+Fonts, colours, column positions and row heights are worked out once when
+the module is imported; rendering an invoice only places the order's text.
+This skips the platypus layout pass (stylesheets, Table wrap/split), which
+dominated the cost of small invoices.
+"""
+from io import BytesIO
+
+from django.conf import settings
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = inch
+TOP = PAGE_HEIGHT - MARGIN
+BOTTOM = MARGIN
+CENTRE = PAGE_WIDTH / 2
+TEXT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+
+FONT = 'Helvetica'
+BOLD_FONT = 'Helvetica-Bold'
+
+TITLE_SIZE = 18
+TEXT_SIZE = 10
+LEADING = 12
+HEADER_SIZE = 14
+CELL_PADDING = 6
+
+# Invoice number/date/status block: two columns centred on the page
+DETAILS_WIDTHS = (2 * inch, 3 * inch)
+DETAILS_LEFT = CENTRE - sum(DETAILS_WIDTHS) / 2
+DETAILS_ROW_HEIGHT = 27
+
+# Items table: the grid lines and the centre of each column
+ITEM_WIDTHS = (3 * inch, 1 * inch, 1.5 * inch, 1.5 * inch)
+ITEM_LEFT = CENTRE - sum(ITEM_WIDTHS) / 2
+ITEM_EDGES = [ITEM_LEFT + sum(ITEM_WIDTHS[:i]) for i in range(len(ITEM_WIDTHS) + 1)]
+ITEM_CENTRES = [(left + right) / 2 for left, right in zip(ITEM_EDGES, ITEM_EDGES[1:])]
+ITEM_HEADER = ('Product', 'Quantity', 'Unit Price', 'Total')
+HEADER_ROW_HEIGHT = 31
+HEADER_POSITIONS = [
+    centre - stringWidth(cell, BOLD_FONT, HEADER_SIZE) / 2 for centre, cell in zip(ITEM_CENTRES, ITEM_HEADER)
+]
+ITEM_ROW_HEIGHT = 18
+
+TITLE_WIDTH = stringWidth('INVOICE', BOLD_FONT, TITLE_SIZE)
+
+HEADER_FILL = colors.grey
+HEADER_TEXT = colors.whitesmoke
+BODY_FILL = colors.beige
+
+
+def money(amount):
+    return f'{settings.INVOICE_CURRENCY_PREFIX}{amount}'
+
+
+def draw_text(pdf, font, size, placements):
+    """Draw (x, y, text) placements as one text object instead of one per string"""
+    text = pdf.beginText()
+    text.setFont(font, size)
+    for x, y, line in placements:
+        text.setTextOrigin(x, y)
+        text.textOut(line)
+    pdf.drawText(text)
+
+
+def centred_row(cells, y, font, size):
+    return [
+        (centre - stringWidth(cell, font, size) / 2, y, cell)
+        for centre, cell in zip(ITEM_CENTRES, cells) if cell
+    ]
+
+
+def draw_heading(pdf, order):
+    """Title, invoice details and billing address; returns the y to continue from"""
+    y = TOP - TITLE_SIZE
+    draw_text(pdf, BOLD_FONT, TITLE_SIZE, [(CENTRE - TITLE_WIDTH / 2, y, 'INVOICE')])
+    y -= 2 * LEADING
+
+    details = (
+        ('Invoice Number:', f'INV-{order.order_id}'),
+        ('Order Date:', order.created_at.strftime('%Y-%m-%d')),
+        ('Payment Status:', order.payment_status.upper()),
+        ('Order Status:', order.status.upper()),
+    )
+    placements = []
+    for label, value in details:
+        placements.append((DETAILS_LEFT + CELL_PADDING, y, label))
+        placements.append((DETAILS_LEFT + DETAILS_WIDTHS[0] + CELL_PADDING, y, value))
+        y -= DETAILS_ROW_HEIGHT
+    y -= LEADING
+
+    draw_text(pdf, BOLD_FONT, TEXT_SIZE, [(MARGIN, y, 'Bill To:')])
+    lines = [order.shipping_name]
+    lines += simpleSplit(order.shipping_address, FONT, TEXT_SIZE, TEXT_WIDTH)
+    lines += [f'{order.shipping_city}, {order.shipping_state} - {order.shipping_pincode}',
+              f'Phone: {order.shipping_phone}']
+    for line in lines:
+        y -= LEADING
+        placements.append((MARGIN, y, line))
+    draw_text(pdf, FONT, TEXT_SIZE, placements)
+    return y - 2 * LEADING
+
+
+def draw_items_page(pdf, rows, top, bold_last):
+    """One page of the items table: header row, then `rows`, from `top` down"""
+    bottom = top - HEADER_ROW_HEIGHT - ITEM_ROW_HEIGHT * len(rows)
+    width = ITEM_EDGES[-1] - ITEM_EDGES[0]
+
+    pdf.setFillColor(HEADER_FILL)
+    pdf.rect(ITEM_LEFT, top - HEADER_ROW_HEIGHT, width, HEADER_ROW_HEIGHT, stroke=0, fill=1)
+    pdf.setFillColor(BODY_FILL)
+    pdf.rect(ITEM_LEFT, bottom, width, top - HEADER_ROW_HEIGHT - bottom, stroke=0, fill=1)
+    pdf.grid(ITEM_EDGES, [top] + [top - HEADER_ROW_HEIGHT - ITEM_ROW_HEIGHT * i for i in range(len(rows) + 1)])
+
+    pdf.setFillColor(HEADER_TEXT)
+    draw_text(pdf, BOLD_FONT, HEADER_SIZE, [
+        (x, top - HEADER_ROW_HEIGHT + 12, cell) for x, cell in zip(HEADER_POSITIONS, ITEM_HEADER)
+    ])
+    pdf.setFillColor(colors.black)
+
+    placements = []
+    y = top - HEADER_ROW_HEIGHT
+    for row in rows[:-1] if bold_last else rows:
+        y -= ITEM_ROW_HEIGHT
+        placements += centred_row(row, y + CELL_PADDING, FONT, TEXT_SIZE)
+    draw_text(pdf, FONT, TEXT_SIZE, placements)
+    if bold_last:
+        draw_text(pdf, BOLD_FONT, TEXT_SIZE, centred_row(rows[-1], bottom + CELL_PADDING, BOLD_FONT, TEXT_SIZE))
+
+
+def render_invoice_pdf(order):
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.setLineWidth(1)
+    pdf.setStrokeColor(colors.black)
+
+    rows = [
+        (item.product_name, str(item.quantity), money(item.product_price), money(item.total_price))
+        for item in order.items.all()
+    ]
+    rows += [
+        ('', '', 'Subtotal:', money(order.total_amount)),
+        ('', '', 'Tax (18%):', money(order.tax_amount)),
+        ('', '', 'Shipping:', money(order.shipping_charges)),
+        ('', '', 'Total:', money(order.final_amount)),
+    ]
+
+    # The table continues on new pages, repeating its header row
+    top = draw_heading(pdf, order)
+    while rows:
+        fits = max(int((top - BOTTOM - HEADER_ROW_HEIGHT) // ITEM_ROW_HEIGHT), 1)
+        page, rows = rows[:fits], rows[fits:]
+        draw_items_page(pdf, page, top, bold_last=not rows)
+        if rows:
+            pdf.showPage()
+            pdf.setLineWidth(1)
+            top = TOP
+
+    pdf.save()
+    return buffer.getvalue()
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.utils.functional import SimpleLazyObject
+
+from .utils import generate_invoice_pdf
+
+# Bump when the PDF layout changes so stored invoices are rebuilt
+INVOICE_LAYOUT_VERSION = 2
+
+# Invoices hold customer addresses, so they live outside MEDIA_ROOT and are
+# only served through the order's invoice endpoint
+invoice_storage = SimpleLazyObject(lambda: FileSystemStorage(location=settings.INVOICE_STORAGE_ROOT))
+
+
+def invoice_fingerprint(order):
+    """Hash of every order field and setting that appears on the invoice PDF"""
+    fields = [
+        INVOICE_LAYOUT_VERSION, settings.INVOICE_CURRENCY_PREFIX, str(order.order_id), order.created_at.strftime('%Y-%m-%d'),
+        order.payment_status, order.status,
+        order.shipping_name, order.shipping_address, order.shipping_city,
+        order.shipping_state, order.shipping_pincode, order.shipping_phone,
+        str(order.total_amount), str(order.tax_amount), str(order.shipping_charges), str(order.final_amount),
+        [[item.product_name, item.quantity, str(item.product_price), str(item.total_price)]
+         for item in order.items.all()],
+    ]
+    return hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+
+
+def invoice_path(order, fingerprint):
+    return f'{order.order_id}/{fingerprint}.pdf'
+
+
+def get_invoice_pdf(order):
+    """
+    Return the invoice PDF for `order`, rendering it only when no stored copy
+    matches the current invoice fields. Returns (pdf bytes, fingerprint).
+    """
+    fingerprint = invoice_fingerprint(order)
+    try:
+        with invoice_storage.open(invoice_path(order, fingerprint), 'rb') as stored:
+            return stored.read(), fingerprint
+    except FileNotFoundError:
+        return render_invoice(order, fingerprint), fingerprint
+
+
+def render_invoice(order, fingerprint=None):
+    """
+    Render the invoice PDF and store it, replacing older copies.
+
+    The PDF is written under a temporary name and renamed over the final
+    one, so a concurrent download finds either the previous file or the
+    whole new one. Copies of older versions of the order are deleted only
+    once the new copy is in place.
+    """
+    fingerprint = fingerprint or invoice_fingerprint(order)
+    name = invoice_path(order, fingerprint)
+    pdf = generate_invoice_pdf(order)
+    # save() picks a unique name, so concurrent renders never share a temporary file
+    temporary = invoice_storage.save(f'{order.order_id}/{fingerprint}.tmp', ContentFile(pdf))
+    os.replace(invoice_storage.path(temporary), invoice_storage.path(name))
+
+    # Drop copies rendered from older versions of the order; .tmp files belong to renders in progress
+    directories, files = invoice_storage.listdir(str(order.order_id))
+    for stale in files:
+        if stale.endswith('.pdf') and stale != f'{fingerprint}.pdf':
+            invoice_storage.delete(f'{order.order_id}/{stale}')
+    return pdf
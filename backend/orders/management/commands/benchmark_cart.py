@@ -0,0 +1,71 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+from orders.models import Cart, CartItem
+from orders.views import CartView
+from products.models import Brand, Category, Product, ProductImage
+
+User = get_user_model()
+
+# Cart, its items with products/category/brand, and the primary images
+# (an empty cart skips the last one)
+MAX_QUERIES = 3
+
+
+class Command(BaseCommand):
+    help = ('Report queries and time for GET /api/orders/cart/ for growing cart sizes and fail if the '
+            'query count grows with the cart; all writes are rolled back')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[0, 1, 10, 50, 100])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        view = CartView.as_view()
+        self.stdout.write(f"{'items':>6} {'queries':>8} {'ms':>9}")
+
+        counts = set()
+        with transaction.atomic():
+            for size in options['sizes']:
+                user = self.prepare_cart(size)
+                timings = []
+                for _ in range(options['repeat']):
+                    request = factory.get('/api/orders/cart/')
+                    force_authenticate(request, user)
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        response = view(request)
+                        response.render()
+                        timings.append((time.perf_counter() - start) * 1000)
+                    if len(response.data['items']) != size:
+                        raise CommandError(f'Expected {size} items, got {len(response.data["items"])}')
+                    counts.add(len(queries.captured_queries))
+                self.stdout.write(f'{size:>6} {len(queries.captured_queries):>8} '
+                                  f'{sorted(timings)[len(timings) // 2]:>9.2f}')
+            transaction.set_rollback(True)
+
+        if max(counts) > MAX_QUERIES:
+            raise CommandError(f'Cart view ran {max(counts)} queries; expected at most {MAX_QUERIES} for any size')
+        self.stdout.write(self.style.SUCCESS(f'At most {MAX_QUERIES} queries for every cart size'))
+
+    def prepare_cart(self, size):
+        category, _ = Category.objects.get_or_create(name='benchmark-cart')
+        brand, _ = Brand.objects.get_or_create(name='benchmark-cart')
+        user = User.objects.create(email=f'cart-bench-{size}@example.com', username=f'cart-bench-{size}')
+        products = Product.objects.bulk_create([
+            Product(name=f'Cart item {i}', description='-', category=category, brand=brand,
+                    sku=f'cart-bench-{size}-{i}', price=1000, effective_price=1000, stock_quantity=10)
+            for i in range(size)
+        ])
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image=f'products/cart-bench-{product.pk}.jpg', is_primary=True)
+            for product in products
+        ])
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.bulk_create([CartItem(cart=cart, product=product, quantity=1) for product in products])
+        return user
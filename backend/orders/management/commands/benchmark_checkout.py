@@ -0,0 +1,63 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+from orders.models import Cart, CartItem
+from orders.views import create_order
+from products.models import Brand, Category, Product
+
+User = get_user_model()
+
+SHIPPING = {
+    'shipping_name': 'Benchmark', 'shipping_phone': '9000000000', 'shipping_address': '1 Main Road',
+    'shipping_city': 'Pune', 'shipping_state': 'Maharashtra', 'shipping_pincode': '411001',
+}
+
+
+class Command(BaseCommand):
+    help = 'Report queries and time per checkout (create_order) for growing cart sizes; all writes are rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1, 5, 20, 50, 100])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        self.stdout.write(f"{'items':>6} {'queries':>8} {'ms':>9}")
+
+        for size in options['sizes']:
+            timings, query_counts = [], set()
+            for _ in range(options['repeat']):
+                with transaction.atomic():
+                    user = self.prepare_cart(size)
+                    request = factory.post('/api/orders/orders/create/', SHIPPING, format='json')
+                    force_authenticate(request, user)
+
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        response = create_order(request)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    if response.status_code != 201:
+                        self.stderr.write(f'Checkout failed: {response.data}')
+                    query_counts.add(len(queries.captured_queries))
+                    transaction.set_rollback(True)
+
+            counts = '/'.join(str(count) for count in sorted(query_counts))
+            self.stdout.write(f'{size:>6} {counts:>8} {sorted(timings)[len(timings) // 2]:>9.2f}')
+
+    def prepare_cart(self, size):
+        category = Category.objects.create(name='benchmark-checkout')
+        brand = Brand.objects.create(name='benchmark-checkout')
+        products = Product.objects.bulk_create([
+            Product(name=f'Checkout item {i}', description='-', category=category, brand=brand,
+                    sku=f'checkout-bench-{i}', price=1000, effective_price=1000, stock_quantity=1000)
+            for i in range(size)
+        ])
+        user = User.objects.create(email='checkout-bench@example.com', username='checkout-bench')
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.bulk_create([CartItem(cart=cart, product=product, quantity=2) for product in products])
+        return user
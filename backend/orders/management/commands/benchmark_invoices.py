@@ -0,0 +1,67 @@
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from orders.models import Order, OrderItem
+from orders.utils import generate_invoice_pdf
+from products.models import Brand, Category, Product
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Report invoice PDF renders per second and peak memory for orders of growing size; all writes are rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, nargs='+', default=[1, 10, 200])
+        parser.add_argument('--seconds', type=float, default=2.0, help='Time spent rendering per size')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'items':>6} {'invoices/s':>11} {'ms':>8} {'peak KiB':>9} {'PDF KiB':>8}")
+        with transaction.atomic():
+            orders = self.prepare_orders(options['items'])
+            for size, order in zip(options['items'], orders):
+                pdf = generate_invoice_pdf(order)  # warm up fonts and module-level state
+
+                renders, start = 0, time.perf_counter()
+                while time.perf_counter() - start < options['seconds']:
+                    generate_invoice_pdf(order)
+                    renders += 1
+                elapsed = time.perf_counter() - start
+
+                tracemalloc.start()
+                generate_invoice_pdf(order)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+                self.stdout.write(
+                    f'{size:>6} {renders / elapsed:>11.0f} {elapsed / renders * 1000:>8.2f} '
+                    f'{peak / 1024:>9.0f} {len(pdf) / 1024:>8.1f}'
+                )
+            transaction.set_rollback(True)
+
+    def prepare_orders(self, sizes):
+        category = Category.objects.create(name='benchmark-invoices')
+        brand = Brand.objects.create(name='benchmark-invoices')
+        product = Product.objects.create(name='Benchmark laptop', description='-', category=category,
+                                         brand=brand, sku='benchmark-invoices', price=54999)
+        user = User.objects.create(email='invoice-bench@example.com', username='invoice-bench')
+
+        orders = []
+        for size in sizes:
+            order = Order.objects.create(
+                user=user, total_amount=Decimal('54999.00') * size, tax_amount=Decimal('9899.82') * size,
+                final_amount=Decimal('64898.82') * size, shipping_name='Benchmark Customer',
+                shipping_phone='9000000000', shipping_address='Flat 4, 12 MG Road, near the metro station',
+                shipping_city='Pune', shipping_state='Maharashtra', shipping_pincode='411001',
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, product_name=f'Benchmark laptop {i} 16GB/512GB',
+                          product_price=Decimal('54999.00'), quantity=1, total_price=Decimal('54999.00'))
+                for i in range(size)
+            ])
+            orders.append(order)
+        return list(Order.objects.filter(pk__in=[o.pk for o in orders]).order_by('pk').prefetch_related('items'))
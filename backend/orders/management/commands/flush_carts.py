@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from orders.cart_store import get_cart_store
+
+
+class Command(BaseCommand):
+    help = "Write carts changed in the cache to the database (CART_STORE = 'cache'); run every minute or so"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Keep running and flush every INTERVAL seconds instead of once')
+
+    def handle(self, *args, **options):
+        store = get_cart_store()
+        if store is None:
+            raise CommandError("Carts are stored in the database (CART_STORE is not 'cache'); nothing to flush")
+
+        while True:
+            start = time.perf_counter()
+            flushed = store.flush_dirty()
+            self.stdout.write(f'Flushed {flushed} carts in {time.perf_counter() - start:.2f}s')
+            if not options['interval']:
+                return
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,118 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from orders.invoices import invoice_fingerprint, invoice_path, invoice_storage, render_invoice
+from orders.models import Order
+
+
+def render_chunk(orders, force):
+    """Runs in a pool process: orders arrive with their items prefetched, so no queries are made"""
+    rendered = 0
+    for order in orders:
+        fingerprint = invoice_fingerprint(order)
+        if force or not invoice_storage.exists(invoice_path(order, fingerprint)):
+            render_invoice(order, fingerprint)
+            rendered += 1
+    return rendered
+
+
+class Command(BaseCommand):
+    help = ('Render invoice PDFs for existing orders into the invoice store across a process pool, '
+            'in order-id chunks, resuming from a checkpoint file')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--chunk-size', type=int, default=200)
+        parser.add_argument('--force', action='store_true',
+                            help='Re-render invoices even when the stored copy is current')
+        parser.add_argument('--checkpoint', default=str(Path(settings.INVOICE_STORAGE_ROOT) / '.regenerate-checkpoint'))
+        parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start from the first order')
+
+    def handle(self, *args, **options):
+        self.checkpoint = Path(options['checkpoint'])
+        last_id = 0 if options['restart'] else self.read_checkpoint()
+        if last_id:
+            self.stdout.write(f'Resuming after order id {last_id}')
+
+        workers, chunk_size = options['workers'], options['chunk_size']
+        total = Order.objects.filter(pk__gt=last_id).count()
+        # Pool processes are forked from this one and must not share its database connection
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+
+        done = rendered = 0
+        pending = {}  # future -> (first id, last id, size)
+        finished = {}  # first id -> (last id, size, rendered) of completed chunks not yet checkpointed
+        start = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            # The fork context starts every worker on the first submit; do it before
+            # this process opens a new connection to read the chunks
+            pool.submit(int).result()
+            for chunk in self.chunks(last_id, chunk_size):
+                pending[pool.submit(render_chunk, chunk, options['force'])] = (chunk[0].pk, chunk[-1].pk, len(chunk))
+                # Keep a couple of chunks per worker in flight so memory stays bounded
+                if len(pending) >= workers * 2:
+                    completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        first, last, size = pending.pop(future)
+                        finished[first] = (last, size, future.result())
+
+                # Chunks finish out of order; only advance the checkpoint past chunks
+                # that have no unfinished chunk before them
+                oldest_pending = min((first for first, _, _ in pending.values()), default=None)
+                while finished and (oldest_pending is None or min(finished) < oldest_pending):
+                    last, size, count = finished.pop(min(finished))
+                    done += size
+                    rendered += count
+                    self.write_checkpoint(last)
+                    self.report(done, total, rendered, start)
+
+            for future in pending:
+                first, last, size = pending[future]
+                finished[first] = (last, size, future.result())
+            for first in sorted(finished):
+                last, size, count = finished[first]
+                done += size
+                rendered += count
+                self.write_checkpoint(last)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'{done} orders checked, {rendered} invoices rendered in {elapsed:.1f}s '
+            f'with {workers} workers ({done / max(elapsed, 1e-9):.0f} orders/s)'
+        ))
+        if self.checkpoint.exists():
+            self.checkpoint.unlink()
+
+    def chunks(self, last_id, chunk_size):
+        """Order-id ordered chunks with their items; each chunk is one keyset query plus one prefetch"""
+        while True:
+            chunk = list(Order.objects.filter(pk__gt=last_id).order_by('pk').prefetch_related('items')[:chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1].pk
+
+    def read_checkpoint(self):
+        try:
+            return json.loads(self.checkpoint.read_text())['last_order_id']
+        except (FileNotFoundError, ValueError, KeyError):
+            return 0
+
+    def write_checkpoint(self, last_id):
+        self.checkpoint.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.checkpoint.with_suffix('.tmp')
+        temporary.write_text(json.dumps({'last_order_id': last_id}))
+        os.replace(temporary, self.checkpoint)
+
+    def report(self, done, total, rendered, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'{done}/{total} orders, {rendered} rendered, {done / max(elapsed, 1e-9):.0f} orders/s')
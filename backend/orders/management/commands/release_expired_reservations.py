@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from orders.inventory import release_expired
+
+
+class Command(BaseCommand):
+    help = 'Return the stock held by expired checkout reservations (run from cron every minute or so)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        released = release_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {released} reserved units'))
@@ -0,0 +1,125 @@
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.utils import timezone
+from orders.inventory import InsufficientStock, release_expired, reserve_stock, take_stock
+from orders.models import Cart, StockReservation
+from products.models import Brand, Category, Product
+
+User = get_user_model()
+
+SKU = 'stress-test-hot-sku'
+
+
+class Command(BaseCommand):
+    help = ('Race many threads for the last units of one product and check that stock is '
+            'never oversold. Uses the configured database and removes its data afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=50)
+        parser.add_argument('--stock', type=int, default=10)
+        parser.add_argument('--quantity', type=int, default=1, help='Units each thread asks for')
+        parser.add_argument('--mode', choices=['checkout', 'reserve'], default='reserve')
+        parser.add_argument('--retries', type=int, default=50,
+                            help='Retries when the database is locked (SQLite has a single writer)')
+
+    def handle(self, *args, **options):
+        self.cleanup()
+        category = Category.objects.create(name='stress-test')
+        brand = Brand.objects.create(name='stress-test')
+        product = Product.objects.create(
+            name='Stress test laptop', description='-', category=category, brand=brand,
+            sku=SKU, price=1000, stock_quantity=options['stock']
+        )
+        carts = [
+            Cart.objects.create(user=User.objects.create(
+                email=f'stress{i}@example.com', username=f'stress-test-{i}'
+            ))
+            for i in range(options['threads'])
+        ]
+
+        try:
+            results = self.race(product, carts, options)
+            self.verify(product, results, options)
+        finally:
+            self.cleanup()
+
+    def race(self, product, carts, options):
+        results = {'ok': 0, 'short': 0, 'error': 0, 'retries': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(carts))
+        operation = reserve_stock if options['mode'] == 'reserve' else take_stock
+
+        def worker(cart):
+            outcome = 'error'
+            try:
+                barrier.wait()
+                for _ in range(options['retries'] + 1):
+                    try:
+                        operation(cart, {product.pk: options['quantity']})
+                        outcome = 'ok'
+                        break
+                    except InsufficientStock:
+                        outcome = 'short'
+                        break
+                    except OperationalError:
+                        with lock:
+                            results['retries'] += 1
+                        time.sleep(random.uniform(0.005, 0.05))
+            finally:
+                with lock:
+                    results[outcome] += 1
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(cart,)) for cart in carts]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results['seconds'] = time.perf_counter() - start
+        return results
+
+    def verify(self, product, results, options):
+        stock, quantity = options['stock'], options['quantity']
+        remaining = Product.objects.values_list('stock_quantity', flat=True).get(pk=product.pk)
+        sold = results['ok'] * quantity
+        self.stdout.write(
+            f"{options['threads']} threads, {options['mode']}: {results['ok']} succeeded, "
+            f"{results['short']} out of stock, {results['error']} errors, "
+            f"{results['retries']} lock retries in {results['seconds']:.2f}s; "
+            f'stock {stock} -> {remaining}'
+        )
+
+        problems = []
+        if sold > stock:
+            problems.append(f'oversold: {sold} units sold from a stock of {stock}')
+        if remaining != stock - sold:
+            problems.append(f'stock is {remaining}, expected {stock - sold}')
+        if results['error'] == 0 and sold < stock - stock % quantity:
+            problems.append(f'undersold: only {sold} of {stock} units went')
+
+        if options['mode'] == 'reserve':
+            held = StockReservation.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+            if held != sold:
+                problems.append(f'{held} units reserved, expected {sold}')
+            release_expired(now=timezone.now() + timedelta(days=1))
+            restored = Product.objects.values_list('stock_quantity', flat=True).get(pk=product.pk)
+            if restored != stock:
+                problems.append(f'stock is {restored} after releasing reservations, expected {stock}')
+
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('No oversell'))
+
+    def cleanup(self):
+        User.objects.filter(username__startswith='stress-test-').delete()
+        Product.objects.filter(sku=SKU).delete()
+        Category.objects.filter(name='stress-test').delete()
+        Brand.objects.filter(name='stress-test').delete()
@@ -27,6 +27,20 @@ class CartItem(models.Model):
     def total_price(self):
         return self.product.discounted_price * self.quantity
 
+class StockReservation(models.Model):
+    """Stock held for a cart in checkout; the units are already out of Product.stock_quantity"""
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'stock_reservations'
+        indexes = [
+            models.Index(fields=['expires_at'], name='reservations_expires_idx'),
+        ]
+
 class Wishlist(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='wishlist')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -88,6 +102,13 @@ class Order(models.Model):
     class Meta:
         db_table = 'orders'
         ordering = ['-created_at']
+        # Access paths used by OrderListView and the admin dashboard/analytics
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='orders_user_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='orders_status_created_idx'),
+            models.Index(fields=['payment_status', 'created_at'], name='orders_paystatus_created_idx'),
+            models.Index(fields=['created_at'], name='orders_created_idx'),
+        ]
     
     def __str__(self):
         return f"Order {self.order_id}"
@@ -122,7 +143,7 @@ class Payment(models.Model):
     order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='payment')
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES)
-    transaction_id = models.CharField(max_length=200, blank=True, null=True)
+    transaction_id = models.CharField(max_length=200, blank=True, null=True, db_index=True)
     gateway_response = models.JSONField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
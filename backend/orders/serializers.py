@@ -19,11 +19,34 @@ class CartSerializer(serializers.ModelSerializer):
         model = Cart
         fields = '__all__'
     
+    def get_totals(self, obj):
+        """Line count and amount from one pass over the items (prefetched by CartView)"""
+        if not hasattr(obj, '_totals'):
+            items = obj.items.all()
+            obj._totals = (len(items), sum(item.total_price for item in items))
+        return obj._totals
+    
     def get_total_items(self, obj):
-        return obj.items.count()
+        return self.get_totals(obj)[0]
     
     def get_total_amount(self, obj):
-        return sum(item.total_price for item in obj.items.all())
+        return self.get_totals(obj)[1]
+
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=['add', 'update', 'remove'])
+    product_id = serializers.IntegerField(required=False)
+    item_id = serializers.IntegerField(required=False)
+    quantity = serializers.IntegerField(min_value=0, default=1)
+    
+    def validate(self, data):
+        if 'product_id' not in data and 'item_id' not in data:
+            raise serializers.ValidationError('product_id or item_id is required')
+        if data['op'] == 'add' and 'product_id' not in data:
+            raise serializers.ValidationError('add takes a product_id')
+        return data
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = serializers.ListField(child=CartOperationSerializer(), min_length=1, max_length=100)
 
 class WishlistItemSerializer(serializers.ModelSerializer):
     product = ProductListSerializer(read_only=True)
@@ -51,6 +74,15 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = '__all__'
 
+class OrderSummarySerializer(serializers.ModelSerializer):
+    """Order history row; `item_count` is annotated by OrderListView"""
+    item_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ('id', 'order_id', 'created_at', 'status', 'payment_status',
+                  'final_amount', 'item_count')
+
 class OrderCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
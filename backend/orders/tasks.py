@@ -0,0 +1,11 @@
+from jobs.queue import task
+from .models import Order
+from .utils import send_invoice_email
+
+
+@task('orders.send_invoice_email')
+def send_invoice(order_id, invoice_type):
+    order = Order.objects.select_related('user').prefetch_related('items').filter(pk=order_id).first()
+    if order is None:
+        return  # deleted since the job was queued
+    send_invoice_email(order, invoice_type, fail_silently=False)
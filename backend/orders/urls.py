@@ -8,9 +8,12 @@ urlpatterns = [
     path('cart/add/', views.add_to_cart, name='add-to-cart'),
     path('cart/update/<int:item_id>/', views.update_cart_item, name='update-cart-item'),
     path('cart/remove/<int:item_id>/', views.remove_from_cart, name='remove-from-cart'),
+    path('cart/batch/', views.batch_update_cart, name='batch-update-cart'),
+    path('cart/reserve/', views.reserve_cart, name='reserve-cart'),
     path('wishlist/', views.WishlistView.as_view(), name='wishlist'),
     path('wishlist/add/', views.add_to_wishlist, name='add-to-wishlist'),
     path('orders/', views.OrderListView.as_view(), name='order-list'),
     path('orders/<uuid:pk>/', views.OrderDetailView.as_view(), name='order-detail'),
+    path('orders/<uuid:pk>/invoice/', views.download_invoice, name='download-invoice'),
     path('orders/create/', views.create_order, name='create-order'),
 ]
\ No newline at end of file
@@ -1,29 +1,77 @@
 from rest_framework import generics, status, permissions
+from django.http import HttpResponse, HttpResponseNotModified
 from decimal import Decimal
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from django.shortcuts import get_object_or_404
-from .utils import send_invoice_email
+from django.utils import timezone
+from .cart_store import (CART_TOKEN_HEADER, CartPermission, cart_owner, clear_user_cart,
+                         flush_user_cart, get_cart_store)
+from .inventory import InsufficientStock, release_reservations, reserve_stock, take_stock
+from .invoices import get_invoice_pdf, invoice_fingerprint
+from .tasks import send_invoice
+from jobs.queue import enqueue
 from django.db import transaction
+from django.db.models import Count, OuterRef, Prefetch, Subquery, prefetch_related_objects
+from django.db.models.functions import Coalesce
 from .models import Cart, CartItem, Wishlist, WishlistItem, Order, OrderItem
-from products.models import Product
-from .serializers import (CartSerializer, CartItemSerializer, WishlistSerializer,
-                         OrderSerializer, OrderCreateSerializer)
+from products.models import Product, ProductImage
+from utils.pagination import CatalogPagination
+from .serializers import (CartSerializer, CartItemSerializer, CartBatchSerializer, WishlistSerializer,
+                         OrderSerializer, OrderSummarySerializer, OrderCreateSerializer)
+
+def items_with_products(item_model):
+    """Prefetch cart/wishlist items with the product data ProductListSerializer reads"""
+    return Prefetch(
+        'items',
+        queryset=item_model.objects.select_related(
+            'product', 'product__category', 'product__brand'
+        ).prefetch_related(
+            Prefetch(
+                'product__images',
+                queryset=ProductImage.objects.filter(is_primary=True),
+                to_attr='primary_images'
+            )
+        )
+    )
+
+def cart_response(data, token, status_code=status.HTTP_200_OK):
+    """Hand anonymous visitors their cart token, in the body and as a header"""
+    response = Response(dict(data, cart_token=token) if token else data, status=status_code)
+    if token:
+        response[CART_TOKEN_HEADER] = token
+    return response
 
 class CartView(generics.RetrieveAPIView):
     serializer_class = CartSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [CartPermission]
+    
+    def retrieve(self, request, *args, **kwargs):
+        store = get_cart_store()
+        if store is not None:
+            owner, token = cart_owner(request)
+            return cart_response(store.cart_data(owner), token)
+        return super().retrieve(request, *args, **kwargs)
     
     def get_object(self):
         cart, created = Cart.objects.get_or_create(user=self.request.user)
+        prefetch_related_objects([cart], items_with_products(CartItem))
         return cart
 
 @api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([CartPermission])
 def add_to_cart(request):
     product_id = request.data.get('product_id')
     quantity = int(request.data.get('quantity', 1))
     
+    store = get_cart_store()
+    if store is not None:
+        if not Product.objects.filter(id=product_id, is_active=True).exists():
+            return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+        owner, token = cart_owner(request)
+        store.add(owner, int(product_id), quantity)
+        return cart_response({'message': 'Product added to cart'}, token)
+    
     try:
         product = Product.objects.get(id=product_id, is_active=True)
         cart, created = Cart.objects.get_or_create(user=request.user)
@@ -43,10 +91,17 @@ def add_to_cart(request):
         return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
 
 @api_view(['PUT'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([CartPermission])
 def update_cart_item(request, item_id):
     quantity = int(request.data.get('quantity', 1))
     
+    store = get_cart_store()
+    if store is not None:
+        owner, token = cart_owner(request)
+        if not store.set_quantity(owner, item_id, quantity):
+            return Response({'error': 'Cart item not found'}, status=status.HTTP_404_NOT_FOUND)
+        return cart_response({'message': 'Cart updated'}, token)
+    
     try:
         cart_item = CartItem.objects.get(id=item_id, cart__user=request.user)
         cart_item.quantity = quantity
@@ -56,8 +111,15 @@ def update_cart_item(request, item_id):
         return Response({'error': 'Cart item not found'}, status=status.HTTP_404_NOT_FOUND)
 
 @api_view(['DELETE'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([CartPermission])
 def remove_from_cart(request, item_id):
+    store = get_cart_store()
+    if store is not None:
+        owner, token = cart_owner(request)
+        if not store.remove(owner, item_id):
+            return Response({'error': 'Cart item not found'}, status=status.HTTP_404_NOT_FOUND)
+        return cart_response({'message': 'Item removed from cart'}, token)
+    
     try:
         cart_item = CartItem.objects.get(id=item_id, cart__user=request.user)
         cart_item.delete()
@@ -65,12 +127,130 @@ def remove_from_cart(request, item_id):
     except CartItem.DoesNotExist:
         return Response({'error': 'Cart item not found'}, status=status.HTTP_404_NOT_FOUND)
 
+def apply_cart_operations(quantities, operations, item_products):
+    """
+    Replay add/update/remove operations over {product_id: quantity}. Returns
+    the new quantities and the indexes of operations naming an item that is
+    not in the cart. An update to 0 removes the line.
+    """
+    quantities = dict(quantities)
+    missing = []
+    for index, operation in enumerate(operations):
+        product_id = operation.get('product_id', item_products.get(operation.get('item_id')))
+        if operation['op'] == 'add':
+            quantities[product_id] = quantities.get(product_id, 0) + operation['quantity']
+        elif product_id not in quantities:
+            missing.append(index)
+        elif operation['op'] == 'update' and operation['quantity'] > 0:
+            quantities[product_id] = operation['quantity']
+        else:
+            del quantities[product_id]
+    return {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}, missing
+
+def cart_operation_errors(missing, unknown):
+    errors = {}
+    if missing:
+        errors['missing_items'] = missing
+    if unknown:
+        errors['unknown_products'] = sorted(unknown)
+    return errors
+
+@api_view(['POST'])
+@permission_classes([CartPermission])
+def batch_update_cart(request):
+    """
+    Apply a list of add/update/remove operations in one request and return
+    the updated cart. Nothing is applied if any operation is invalid.
+    """
+    serializer = CartBatchSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    operations = serializer.validated_data['operations']
+
+    added = {operation['product_id'] for operation in operations if operation['op'] == 'add'}
+    active = set(Product.objects.filter(pk__in=added, is_active=True).values_list('pk', flat=True))
+
+    store = get_cart_store()
+    if store is not None:
+        owner, token = cart_owner(request)
+        errors = {}
+
+        def change(lines):
+            quantities, missing = apply_cart_operations(
+                {product_id: line['quantity'] for product_id, line in lines.items()},
+                operations, {product_id: product_id for product_id in lines}
+            )
+            errors.update(cart_operation_errors(missing, set(quantities) - set(lines) - active))
+            if errors:
+                return False
+            for product_id in set(lines) - set(quantities):
+                del lines[product_id]
+            for product_id, quantity in quantities.items():
+                lines.setdefault(product_id, {'added_at': timezone.now()})['quantity'] = quantity
+
+        store.edit(owner, change)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        return cart_response(store.cart_data(owner), token)
+
+    with transaction.atomic():
+        cart, created = Cart.objects.get_or_create(user=request.user)
+        rows = {product_id: (pk, quantity) for pk, product_id, quantity
+                in cart.items.values_list('pk', 'product_id', 'quantity')}
+        quantities, missing = apply_cart_operations(
+            {product_id: quantity for product_id, (pk, quantity) in rows.items()},
+            operations, {pk: product_id for product_id, (pk, quantity) in rows.items()}
+        )
+        errors = cart_operation_errors(missing, set(quantities) - set(rows) - active)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # One DELETE for removed lines and one upsert for new or changed ones
+        CartItem.objects.filter(cart=cart, product_id__in=set(rows) - set(quantities)).delete()
+        CartItem.objects.bulk_create(
+            [CartItem(cart=cart, product_id=product_id, quantity=quantity)
+             for product_id, quantity in quantities.items()
+             if product_id not in rows or rows[product_id][1] != quantity],
+            update_conflicts=True, unique_fields=['cart', 'product'], update_fields=['quantity']
+        )
+
+    prefetch_related_objects([cart], items_with_products(CartItem))
+    return Response(CartSerializer(cart).data)
+
+@api_view(['POST', 'DELETE'])
+@permission_classes([permissions.IsAuthenticated])
+def reserve_cart(request):
+    """Hold the cart's stock while the user is in checkout, or release it (DELETE)"""
+    flush_user_cart(request.user)
+    cart, created = Cart.objects.get_or_create(user=request.user)
+
+    if request.method == 'DELETE':
+        release_reservations(cart)
+        return Response({'message': 'Reservation released'}, status=status.HTTP_200_OK)
+
+    quantities = dict(cart.items.values_list('product_id', 'quantity'))
+    if not quantities:
+        return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        reservations = reserve_stock(cart, quantities)
+    except InsufficientStock as e:
+        return Response({'error': 'Insufficient stock', 'product_ids': e.product_ids},
+                        status=status.HTTP_409_CONFLICT)
+
+    return Response({
+        'message': 'Stock reserved',
+        'expires_at': reservations[0].expires_at,
+        'items': [{'product_id': r.product_id, 'quantity': r.quantity} for r in reservations]
+    }, status=status.HTTP_200_OK)
+
 class WishlistView(generics.RetrieveAPIView):
     serializer_class = WishlistSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
         wishlist, created = Wishlist.objects.get_or_create(user=self.request.user)
+        prefetch_related_objects([wishlist], items_with_products(WishlistItem))
         return wishlist
 
 @api_view(['POST'])
@@ -95,18 +275,47 @@ def add_to_wishlist(request):
         return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
 
 class OrderListView(generics.ListAPIView):
-    serializer_class = OrderSerializer
+    serializer_class = OrderSummarySerializer
     permission_classes = [permissions.IsAuthenticated]
+    # ?pagination=cursor seeks on (created_at, id), which orders_user_created_idx serves
+    pagination_class = CatalogPagination
+    ordering = '-created_at'
     
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        # A correlated subquery is only evaluated for the rows on the page,
+        # unlike a JOIN + GROUP BY over all of the user's orders
+        item_count = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order').annotate(
+            count=Count('pk')
+        ).values('count')
+        return Order.objects.filter(user=self.request.user).only(
+            'id', 'order_id', 'created_at', 'status', 'payment_status', 'final_amount'
+        ).annotate(item_count=Coalesce(Subquery(item_count), 0))
 
 class OrderDetailView(generics.RetrieveAPIView):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    lookup_field = 'order_id'  # the URL carries the order UUID as <pk>
+    lookup_url_kwarg = 'pk'
     
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return Order.objects.filter(user=self.request.user).prefetch_related('items')
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def download_invoice(request, pk):
+    order = get_object_or_404(
+        Order.objects.prefetch_related('items'), order_id=pk, user=request.user
+    )
+    etag = f'"{invoice_fingerprint(order)}"'
+    if request.headers.get('If-None-Match') == etag:
+        return HttpResponseNotModified(headers={'ETag': etag})
+
+    pdf, fingerprint = get_invoice_pdf(order)
+    response = HttpResponse(pdf, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="Invoice-{order.order_id}.pdf"'
+    response['ETag'] = f'"{fingerprint}"'
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -116,13 +325,17 @@ def create_order(request):
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    # Carts kept in the cache are written to the database before they are read
+    flush_user_cart(request.user)
+
     try:
         with transaction.atomic():
-            # Get the user's cart
-            cart = Cart.objects.get(user=request.user)
-            cart_items = cart.items.all()
+            # Load the cart with its products in one query
+            cart_items = list(CartItem.objects.select_related('product').filter(cart__user=request.user))
 
-            if not cart_items.exists():
+            if not cart_items:
+                if not Cart.objects.filter(user=request.user).exists():
+                    raise Cart.DoesNotExist
                 return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
 
             # Calculate totals
@@ -141,9 +354,9 @@ def create_order(request):
                 **serializer.validated_data
             )
 
-            # Create order items and update stock
-            for cart_item in cart_items:
-                OrderItem.objects.create(
+            # Create order items and take the stock in one conditional UPDATE
+            OrderItem.objects.bulk_create([
+                OrderItem(
                     order=order,
                     product=cart_item.product,
                     product_name=cart_item.product.name,
@@ -151,30 +364,29 @@ def create_order(request):
                     quantity=cart_item.quantity,
                     total_price=cart_item.total_price
                 )
-
-                product = cart_item.product
-                product.stock_quantity -= cart_item.quantity
-                product.save()
+                for cart_item in cart_items
+            ])
+            take_stock(cart_items[0].cart_id, {item.product_id: item.quantity for item in cart_items})
 
             # Clear the cart
-            cart_items.delete()
+            CartItem.objects.filter(pk__in=[item.pk for item in cart_items]).delete()
+            transaction.on_commit(lambda: clear_user_cart(request.user))
 
-            # Try sending the invoice email
-            invoice_sent = False
-            try:
-                send_invoice_email(order, "order_confirmation")
-                invoice_sent = True
-            except Exception as e:
-                print(f"[Invoice Email Error] {str(e)}")
+            # The invoice PDF and email are sent by the job worker once this commits
+            enqueue(send_invoice, {'order_id': order.pk, 'invoice_type': 'order_confirmation'})
 
             return Response({
                 'message': 'Order created successfully',
                 'order_id': order.order_id,
                 'final_amount': final_amount,
-                'invoice_sent': invoice_sent
+                'invoice_sent': True,  # kept for existing clients; the email now goes out from the job queue
+                'invoice_queued': True
             }, status=status.HTTP_201_CREATED)
 
     except Cart.DoesNotExist:
         return Response({'error': 'Cart not found'}, status=status.HTTP_404_NOT_FOUND)
+    except InsufficientStock as e:
+        return Response({'error': 'Insufficient stock', 'product_ids': e.product_ids},
+                        status=status.HTTP_409_CONFLICT)
     except Exception as e:
         return Response({'error': f'Unexpected error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -0,0 +1,135 @@
+import asyncio
+import weakref
+
+import httpx
+from django.conf import settings
+
+from .clients import circuit_breaker, get_razorpay
+
+
+class GatewayError(Exception):
+    """The gateway answered with an error"""
+
+
+class GatewayServerError(GatewayError):
+    """A 5xx or 429 answer; counts against the circuit breaker"""
+
+
+class AsyncGateway:
+    """
+    An httpx.AsyncClient for one gateway, with the same timeouts and
+    circuit breaker settings as the sync clients in clients.py. The pool
+    is larger (PAYMENT_ASYNC_POOL_SIZE): one event loop has many requests
+    in flight at once.
+    """
+    name = None
+    default_base_url = None
+
+    def __init__(self):
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url(),
+            auth=self.auth(),
+            timeout=httpx.Timeout(settings.PAYMENT_READ_TIMEOUT, connect=settings.PAYMENT_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.PAYMENT_ASYNC_POOL_SIZE,
+                max_keepalive_connections=settings.PAYMENT_ASYNC_POOL_SIZE,
+            ),
+        )
+        self.breaker = circuit_breaker(self.name, (httpx.TransportError, GatewayServerError), httpx.TimeoutException)
+
+    def base_url(self):
+        raise NotImplementedError
+
+    def auth(self):
+        raise NotImplementedError
+
+    def error_message(self, data):
+        return str(data)
+
+    async def request(self, method, path, **kwargs):
+        return await self.breaker.acall(self.send, method, path, **kwargs)
+
+    async def send(self, method, path, **kwargs):
+        response = await self.client.request(method, path, **kwargs)
+        if response.status_code < 400:
+            return response.json()
+        try:
+            message = self.error_message(response.json())
+        except ValueError:
+            message = response.text
+        if response.status_code >= 500 or response.status_code == 429:
+            raise GatewayServerError(message)
+        raise GatewayError(message)
+
+
+class AsyncStripeGateway(AsyncGateway):
+    name = 'Stripe'
+
+    def base_url(self):
+        return settings.STRIPE_API_BASE or 'https://api.stripe.com'
+
+    def auth(self):
+        return (settings.STRIPE_SECRET_KEY, '')
+
+    def error_message(self, data):
+        return data.get('error', {}).get('message', '')
+
+    async def create_payment_intent(self, **params):
+        return await self.request('POST', '/v1/payment_intents', data=stripe_form(params))
+
+    async def retrieve_payment_intent(self, intent_id):
+        return await self.request('GET', f'/v1/payment_intents/{intent_id}')
+
+
+class AsyncRazorpayGateway(AsyncGateway):
+    name = 'Razorpay'
+
+    def base_url(self):
+        return settings.RAZORPAY_API_BASE or 'https://api.razorpay.com'
+
+    def auth(self):
+        return (settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
+
+    def error_message(self, data):
+        return data.get('error', {}).get('description', '')
+
+    async def create_order(self, data):
+        return await self.request('POST', '/v1/orders', json=data)
+
+    def verify_payment_signature(self, data):
+        # Local HMAC check, no request is made
+        return get_razorpay().verify_payment_signature(data)
+
+
+def stripe_form(params):
+    """Stripe's form encoding: nested dicts become metadata[order_id]=..."""
+    form = {}
+    for key, value in params.items():
+        if isinstance(value, dict):
+            form.update({f'{key}[{inner}]': inner_value for inner, inner_value in value.items()})
+        else:
+            form[key] = value
+    return form
+
+
+# An AsyncClient's connections belong to the event loop that opened them
+_gateways = weakref.WeakKeyDictionary()
+
+
+def get_async_gateway(gateway_class):
+    gateways = _gateways.setdefault(asyncio.get_running_loop(), {})
+    if gateway_class not in gateways:
+        gateways[gateway_class] = gateway_class()
+    return gateways[gateway_class]
+
+
+def get_async_stripe():
+    return get_async_gateway(AsyncStripeGateway)
+
+
+def get_async_razorpay():
+    return get_async_gateway(AsyncRazorpayGateway)
+
+
+def reset_async_gateways():
+    _gateways.clear()
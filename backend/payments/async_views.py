@@ -0,0 +1,157 @@
+"""
+Async versions of the payment views, used under ASGI (see config/asgi.py).
+
+DRF views are sync, so these are plain Django async views: they
+authenticate with the same JWT tokens, make gateway calls with httpx and
+query the database with the async ORM, so a worker keeps serving other
+requests while one waits on Stripe or Razorpay. Payments are written by
+the same record_payment() as the sync views.
+"""
+import json
+from functools import wraps
+
+import razorpay
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from orders.models import Order
+
+from .async_clients import GatewayError, get_async_razorpay, get_async_stripe
+from .clients import GatewayFailure
+from .idempotency import idempotent_async
+from .views import PAYMENT_CONFIRMED, OrderAlreadyPaid, record_payment, recorded_payments
+
+
+def async_api_view(view):
+    """POST only and JWT authenticated; sets request.user and request.data like DRF"""
+    @wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        if request.method != 'POST':
+            return JsonResponse({'detail': f'Method "{request.method}" not allowed.'},
+                                status=status.HTTP_405_METHOD_NOT_ALLOWED)
+        try:
+            authenticated = await sync_to_async(JWTAuthentication().authenticate)(request)
+        except AuthenticationFailed as e:
+            return JsonResponse({'detail': e.detail}, status=status.HTTP_401_UNAUTHORIZED)
+        if authenticated is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'},
+                                status=status.HTTP_401_UNAUTHORIZED)
+        request.user = authenticated[0]
+
+        if request.content_type == 'application/json':
+            try:
+                request.data = json.loads(request.body or b'{}')
+            except ValueError:
+                request.data = None
+            if not isinstance(request.data, dict):
+                return JsonResponse({'detail': 'JSON parse error'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            request.data = request.POST.dict()
+        return await view(request, *args, **kwargs)
+
+    # Token authenticated, like the DRF views
+    wrapped.csrf_exempt = True
+    return wrapped
+
+
+def error_response(e):
+    """The same status and body as the except clauses of the sync views"""
+    if isinstance(e, GatewayFailure):
+        return JsonResponse({'error': str(e)}, status=e.status_code)
+    if isinstance(e, OrderAlreadyPaid):
+        return JsonResponse({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+    return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+async def already_recorded(request, transaction_id):
+    return bool(transaction_id) and await recorded_payments(request, transaction_id).aexists()
+
+
+@async_api_view
+async def create_payment_intent(request):
+    try:
+        order = await Order.objects.aget(order_id=request.data.get('order_id'), user=request.user)
+        intent = await get_async_stripe().create_payment_intent(
+            amount=int(order.final_amount * 100),  # Amount in cents
+            currency='inr',
+            metadata={'order_id': str(order.order_id)}
+        )
+        return JsonResponse({
+            'client_secret': intent['client_secret'],
+            'amount': float(order.final_amount)
+        })
+    except Order.DoesNotExist:
+        return JsonResponse({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return error_response(e)
+
+
+@async_api_view
+@idempotent_async
+async def confirm_payment(request):
+    try:
+        payment_intent_id = request.data.get('payment_intent_id')
+        order_id = request.data.get('order_id')
+        if await already_recorded(request, payment_intent_id):
+            return JsonResponse(PAYMENT_CONFIRMED)
+
+        intent = await get_async_stripe().retrieve_payment_intent(payment_intent_id)
+        if intent['status'] == 'canceled':
+            return JsonResponse({'error': 'Payment failed'}, status=status.HTTP_400_BAD_REQUEST)
+        if intent['status'] != 'succeeded':
+            return JsonResponse({'error': 'Payment is not complete yet', 'payment_status': intent['status']},
+                                status=status.HTTP_409_CONFLICT)
+
+        await sync_to_async(record_payment)(request.user, order_id, 'stripe', payment_intent_id, queue_invoice=True)
+        return JsonResponse(PAYMENT_CONFIRMED)
+    except (Order.DoesNotExist, ValidationError, GatewayError, GatewayFailure, OrderAlreadyPaid) as e:
+        return error_response(e)
+
+
+@async_api_view
+async def create_razorpay_order(request):
+    try:
+        order = await Order.objects.aget(order_id=request.data.get('order_id'), user=request.user)
+        razorpay_order = await get_async_razorpay().create_order({
+            'amount': int(order.final_amount * 100),
+            'currency': 'INR',
+            'notes': {
+                'order_id': str(order.order_id)
+            }
+        })
+        return JsonResponse({
+            'razorpay_order_id': razorpay_order['id'],
+            'amount': float(order.final_amount),
+            'currency': 'INR',
+            'key': settings.RAZORPAY_KEY_ID
+        })
+    except Order.DoesNotExist:
+        return JsonResponse({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return error_response(e)
+
+
+@async_api_view
+@idempotent_async
+async def verify_razorpay_payment(request):
+    try:
+        payment_data = {
+            'razorpay_order_id': request.data.get('razorpay_order_id'),
+            'razorpay_payment_id': request.data.get('razorpay_payment_id'),
+            'razorpay_signature': request.data.get('razorpay_signature')
+        }
+        if await already_recorded(request, payment_data['razorpay_payment_id']):
+            return JsonResponse({'message': 'Payment verified successfully'})
+
+        get_async_razorpay().verify_payment_signature(payment_data)
+        await sync_to_async(record_payment)(
+            request.user, request.data.get('order_id'), 'razorpay', payment_data['razorpay_payment_id']
+        )
+        return JsonResponse({'message': 'Payment verified successfully'})
+    except (Order.DoesNotExist, ValidationError, razorpay.errors.SignatureVerificationError,
+            OrderAlreadyPaid) as e:
+        return error_response(e)
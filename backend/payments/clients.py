@@ -0,0 +1,222 @@
+import os
+import threading
+import time
+
+import razorpay
+import requests
+import stripe
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+class GatewayFailure(Exception):
+    """
+    The gateway gave no usable answer: it could not be reached or failed
+    with a server error. The outcome is unknown, so the request can be
+    retried; views answer with `status_code`.
+    """
+    status_code = 502
+
+
+class GatewayTimeout(GatewayFailure):
+    """The gateway did not answer within PAYMENT_READ_TIMEOUT"""
+    status_code = 504
+
+
+class GatewayUnavailable(GatewayFailure):
+    """The gateway's circuit is open; the call was not attempted"""
+    status_code = 503
+
+
+class InvalidSignature(Exception):
+    """A webhook body does not match its signature header"""
+
+
+class CircuitBreaker:
+    """
+    Fails fast after `threshold` consecutive failures.
+
+    While open, every call raises GatewayUnavailable until `reset_timeout`
+    seconds have passed; then a single trial call is let through, which
+    closes the circuit on success or opens it again on failure. Only
+    `failures` count: a declined card is an answer, a timeout is not.
+    They are raised as GatewayFailure, or GatewayTimeout for `timeouts`.
+    """
+
+    def __init__(self, name, failures, threshold, reset_timeout, timeouts=()):
+        self.name = name
+        self.failures = failures
+        self.timeouts = timeouts
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return 'open'
+        return 'half-open'
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == 'open' or (state == 'half-open' and self.trial_running):
+                raise GatewayUnavailable(f'{self.name} is unavailable, try again shortly')
+            self.trial_running = state == 'half-open'
+
+    def record(self, success):
+        with self._lock:
+            self.trial_running = False
+            if success:
+                self.consecutive_failures = 0
+                self.opened_at = None
+                return
+            self.consecutive_failures += 1
+            if self.opened_at is not None or self.consecutive_failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    def call(self, func, *args, **kwargs):
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except self.failures as e:
+            self.record(False)
+            raise self.failure(e) from e
+        except Exception:
+            self.record(True)
+            raise
+        self.record(True)
+        return result
+
+    def failure(self, error):
+        # Client libraries wrap the transport error, e.g. stripe's APIConnectionError
+        if any(isinstance(e, self.timeouts) for e in (error, error.__cause__, error.__context__)):
+            return GatewayTimeout(f'{self.name} did not answer in time')
+        return GatewayFailure(f'{self.name} request failed, try again shortly')
+
+    async def acall(self, func, *args, **kwargs):
+        self.before_call()
+        try:
+            result = await func(*args, **kwargs)
+        except self.failures as e:
+            self.record(False)
+            raise self.failure(e) from e
+        except Exception:
+            self.record(True)
+            raise
+        self.record(True)
+        return result
+
+
+class TimeoutSession(requests.Session):
+    """A requests session that applies a default (connect, read) timeout"""
+
+    def __init__(self, timeout, pool_size):
+        super().__init__()
+        self.timeout = timeout
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, *args, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(*args, **kwargs)
+
+
+def gateway_timeout():
+    return (settings.PAYMENT_CONNECT_TIMEOUT, settings.PAYMENT_READ_TIMEOUT)
+
+
+def circuit_breaker(name, failures, timeouts):
+    return CircuitBreaker(name, failures, settings.PAYMENT_CIRCUIT_FAILURES, settings.PAYMENT_CIRCUIT_RESET, timeouts)
+
+
+class StripeGateway:
+    failures = (stripe.error.APIConnectionError, stripe.error.APIError, stripe.error.RateLimitError)
+
+    def __init__(self):
+        # The stripe module is configured globally; this is the only place that does it
+        stripe.api_key = settings.STRIPE_SECRET_KEY
+        if settings.STRIPE_API_BASE:
+            stripe.api_base = settings.STRIPE_API_BASE
+        stripe.max_network_retries = 0
+        stripe.default_http_client = stripe.RequestsClient(
+            timeout=gateway_timeout(),
+            session=TimeoutSession(gateway_timeout(), settings.PAYMENT_POOL_SIZE),
+        )
+        self.breaker = circuit_breaker('Stripe', self.failures, requests.Timeout)
+
+    def create_payment_intent(self, **params):
+        return self.breaker.call(stripe.PaymentIntent.create, **params)
+
+    def retrieve_payment_intent(self, intent_id):
+        return self.breaker.call(stripe.PaymentIntent.retrieve, intent_id)
+
+    def verify_webhook(self, body, signature):
+        try:
+            stripe.WebhookSignature.verify_header(body.decode(), signature, settings.STRIPE_WEBHOOK_SECRET)
+        except (stripe.error.SignatureVerificationError, UnicodeDecodeError):
+            raise InvalidSignature
+
+
+class RazorpayGateway:
+    failures = (razorpay.errors.ServerError, razorpay.errors.GatewayError, requests.RequestException)
+
+    def __init__(self):
+        options = {'base_url': settings.RAZORPAY_API_BASE} if settings.RAZORPAY_API_BASE else {}
+        self.client = razorpay.Client(
+            session=TimeoutSession(gateway_timeout(), settings.PAYMENT_POOL_SIZE),
+            auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET),
+            **options
+        )
+        self.breaker = circuit_breaker('Razorpay', self.failures, requests.Timeout)
+
+    def create_order(self, data):
+        return self.breaker.call(self.client.order.create, data)
+
+    def verify_payment_signature(self, data):
+        # Local HMAC check, no request is made
+        return self.client.utility.verify_payment_signature(data)
+
+    def verify_webhook(self, body, signature):
+        try:
+            self.client.utility.verify_webhook_signature(body.decode(), signature, settings.RAZORPAY_WEBHOOK_SECRET)
+        except (razorpay.errors.SignatureVerificationError, UnicodeDecodeError, TypeError):
+            raise InvalidSignature
+
+
+_gateways = {}
+_gateways_lock = threading.Lock()
+
+
+def get_gateway(gateway_class):
+    """
+    The process-wide instance of `gateway_class`. Instances are rebuilt
+    after a fork so worker processes never share pooled sockets.
+    """
+    key = (gateway_class, os.getpid())
+    gateway = _gateways.get(key)
+    if gateway is None:
+        with _gateways_lock:
+            gateway = _gateways.get(key)
+            if gateway is None:
+                gateway = _gateways[key] = gateway_class()
+    return gateway
+
+
+def get_stripe():
+    return get_gateway(StripeGateway)
+
+
+def get_razorpay():
+    return get_gateway(RazorpayGateway)
+
+
+def reset_gateways():
+    """Drop the cached clients, e.g. after changing gateway settings"""
+    _gateways.clear()
@@ -0,0 +1,110 @@
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class FakeGatewayHandler(BaseHTTPRequestHandler):
+    """
+    Answers the Stripe and Razorpay calls the payments app makes:
+
+    - POST /v1/payment_intents and GET /v1/payment_intents/<id> (Stripe)
+    - POST /v1/orders (Razorpay)
+
+    Intents are always `succeeded` when retrieved. Latency and failures
+    come from the server's `behaviour` dict.
+    """
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real gateways
+
+    def do_GET(self):
+        if self.path.startswith('/v1/payment_intents/'):
+            intent_id = self.path.rsplit('/', 1)[1]
+            self.respond(lambda: self.payment_intent(intent_id, 'succeeded', 0))
+        else:
+            self.send_json(404, {'error': {'message': 'Unknown path'}})
+
+    def do_POST(self):
+        body = self.read_body()
+        if self.path == '/v1/payment_intents':
+            self.respond(lambda: self.payment_intent(
+                f'pi_fake_{uuid.uuid4().hex[:24]}', 'requires_payment_method', int(body.get('amount', 0))
+            ))
+        elif self.path == '/v1/orders':
+            self.respond(lambda: {
+                'id': f'order_fake{uuid.uuid4().hex[:14]}', 'entity': 'order', 'status': 'created',
+                'amount': int(body.get('amount', 0)), 'currency': body.get('currency', 'INR'),
+                'notes': body.get('notes', {}),
+            })
+        else:
+            self.send_json(404, {'error': {'message': 'Unknown path'}})
+
+    def read_body(self):
+        raw = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode()
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            return json.loads(raw or '{}')
+        return {key: values[0] for key, values in parse_qs(raw).items()}
+
+    def payment_intent(self, intent_id, intent_status, amount):
+        return {
+            'id': intent_id, 'object': 'payment_intent', 'status': intent_status,
+            'amount': amount, 'currency': 'inr', 'client_secret': f'{intent_id}_secret_fake',
+        }
+
+    def respond(self, build):
+        behaviour = self.server.behaviour
+        self.server.track_in_flight(1)
+        try:
+            if random.random() < behaviour['hang_rate']:
+                time.sleep(behaviour['hang'])
+            delay = behaviour['latency'] + random.uniform(0, behaviour['jitter'])
+            time.sleep(delay / 1000)
+        finally:
+            self.server.track_in_flight(-1)
+        if random.random() < behaviour['error_rate']:
+            # Shaped so both client libraries raise their server-error exceptions
+            self.send_json(500, {'error': {'message': 'Fake gateway failure', 'type': 'api_error',
+                                           'code': 'SERVER_ERROR', 'description': 'Fake gateway failure'}})
+        else:
+            self.send_json(200, build())
+
+    def send_json(self, status_code, data):
+        body = json.dumps(data).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class FakeGatewayServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # load tests open hundreds of connections at once
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def track_in_flight(self, change):
+        """Requests being answered at once; the peak shows how much concurrency the client reached"""
+        with self._lock:
+            self.in_flight += change
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+
+def make_fake_gateway(host='127.0.0.1', port=0, latency=50, jitter=50, error_rate=0, hang_rate=0, hang=60,
+                      verbose=False):
+    """A threaded fake gateway server; port 0 picks a free port. Call serve_forever() to run it."""
+    server = FakeGatewayServer((host, port), FakeGatewayHandler)
+    server.verbose = verbose
+    server.behaviour = {'latency': latency, 'jitter': jitter, 'error_rate': error_rate,
+                        'hang_rate': hang_rate, 'hang': hang}
+    return server
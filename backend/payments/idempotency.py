@@ -0,0 +1,128 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+# Answers that will not change on retry: the request itself is invalid or the payment was declined
+FINAL_ERROR_STATUSES = {status.HTTP_400_BAD_REQUEST, status.HTTP_402_PAYMENT_REQUIRED, status.HTTP_404_NOT_FOUND}
+
+
+def request_hash(request):
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def is_final(status_code):
+    return status.is_success(status_code) or status_code in FINAL_ERROR_STATUSES
+
+
+def claim_key(request, endpoint, key):
+    """
+    Returns (record, None) when this request should run, or (None, response)
+    when it must not: a stored response to replay, or an error.
+    """
+    fingerprint = request_hash(request)
+    keys = IdempotencyKey.objects.filter(user=request.user, endpoint=endpoint, key=key)
+    record = keys.first()
+    now = timezone.now()
+    if record is not None and record.created_at < now - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL):
+        keys.delete()
+        record = None
+    if record is None:
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    user=request.user, endpoint=endpoint, key=key, request_hash=fingerprint
+                ), None
+        except IntegrityError:
+            # A concurrent request with the same key got there first
+            record = keys.get()
+
+    if record.request_hash != fingerprint:
+        return None, Response({'error': f'{IDEMPOTENCY_HEADER} was already used with a different request'},
+                              status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    if record.status_code is not None:
+        return None, Response(record.response, status=record.status_code, headers={REPLAYED_HEADER: 'true'})
+
+    # The first request is still running, unless it died holding the key
+    stale = now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+    if keys.filter(status_code__isnull=True, created_at__lt=stale).update(created_at=now):
+        return record, None
+    return None, Response({'error': 'A request with this Idempotency-Key is already in progress'},
+                          status=status.HTTP_409_CONFLICT)
+
+
+def idempotent(view):
+    """
+    Replay the stored response when a request is retried with the same
+    Idempotency-Key header, without running the view again. Only final
+    outcomes are stored (see is_final); after a timeout, a 5xx or a 409
+    the key is released so the request can be retried. Apply below
+    @api_view so request.data is available.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({'error': f'{IDEMPOTENCY_HEADER} is too long'}, status=status.HTTP_400_BAD_REQUEST)
+
+        record, response = claim_key(request, view.__name__, key)
+        if response is not None:
+            return response
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        if is_final(response.status_code):
+            record.status_code = response.status_code
+            record.response = response.data
+            record.save(update_fields=['status_code', 'response'])
+        else:
+            record.delete()
+        return response
+    return wrapped
+
+
+def idempotent_async(view):
+    """idempotent() for the async views in async_views.py, which return JsonResponse"""
+    @wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return await view(request, *args, **kwargs)
+        if len(key) > 255:
+            return JsonResponse({'error': f'{IDEMPOTENCY_HEADER} is too long'}, status=status.HTTP_400_BAD_REQUEST)
+
+        record, response = await sync_to_async(claim_key)(request, view.__name__, key)
+        if response is not None:
+            headers = {REPLAYED_HEADER: response[REPLAYED_HEADER]} if response.has_header(REPLAYED_HEADER) else None
+            return JsonResponse(response.data, status=response.status_code, headers=headers, safe=False)
+        try:
+            response = await view(request, *args, **kwargs)
+        except Exception:
+            await record.adelete()
+            raise
+        if is_final(response.status_code):
+            record.status_code = response.status_code
+            record.response = json.loads(response.content)
+            await record.asave(update_fields=['status_code', 'response'])
+        else:
+            await record.adelete()
+        return response
+    return wrapped
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import AsyncRequestFactory
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+from orders.models import Order
+from payments import async_views, views
+from payments.async_clients import reset_async_gateways
+from payments.clients import reset_gateways
+from payments.fake_gateway import make_fake_gateway
+
+User = get_user_model()
+
+VIEWS = ['create_razorpay_order', 'create_payment_intent']
+
+
+class Command(BaseCommand):
+    help = ('Send the same burst of requests to a sync payment view, served by a fixed number of '
+            'worker threads, and to its async version on one event loop, against a local fake '
+            'gateway with a fixed delay. "at gateway" is the most requests the gateway saw at once.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--view', choices=VIEWS, default=VIEWS[0])
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Sync worker threads, i.e. the WSGI worker pool')
+        parser.add_argument('--concurrency', type=int, default=100,
+                            help='Requests in flight at once on the event loop')
+        parser.add_argument('--latency', type=float, default=200, help='Fake gateway delay in ms')
+
+    def handle(self, *args, **options):
+        server = make_fake_gateway(latency=options['latency'], jitter=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{server.server_address[1]}'
+
+        user = User.objects.create_user(
+            email='payments-benchmark@example.com', username='payments-benchmark', password=None
+        )
+        try:
+            order = Order.objects.create(
+                user=user, total_amount=1000, final_amount=1000, shipping_name='Benchmark',
+                shipping_phone='9000000000', shipping_address='1 Main Road', shipping_city='Pune',
+                shipping_state='Maharashtra', shipping_pincode='411001',
+            )
+            with override_settings(STRIPE_API_BASE=base, RAZORPAY_API_BASE=base,
+                                   PAYMENT_POOL_SIZE=options['workers'],
+                                   PAYMENT_ASYNC_POOL_SIZE=options['concurrency']):
+                reset_gateways()
+                reset_async_gateways()
+                results = []
+                for mode, parallel, run in [
+                    ('sync', options['workers'], lambda: self.run_sync(user, order, options)),
+                    ('async', options['concurrency'], lambda: asyncio.run(self.run_async(user, order, options))),
+                ]:
+                    server.peak_in_flight = 0
+                    elapsed, statuses = run()
+                    results.append((mode, parallel, elapsed, statuses, server.peak_in_flight))
+        finally:
+            user.delete()
+            server.shutdown()
+            server.server_close()
+            reset_gateways()
+
+        self.stdout.write(f"{options['requests']} x {options['view']}, gateway delay {options['latency']:.0f} ms")
+        self.stdout.write(
+            f"{'mode':<6} {'parallel':>8} {'at gateway':>10} {'seconds':>8} {'req/s':>8} {'max req/s':>10}  statuses"
+        )
+        for mode, parallel, elapsed, statuses, peak in results:
+            # What `parallel` requests at a time could reach if only the gateway delay counted
+            ceiling = f"{parallel / (options['latency'] / 1000):.1f}" if options['latency'] else '-'
+            self.stdout.write(
+                f"{mode:<6} {parallel:>8} {peak:>10} {elapsed:>8.2f} {options['requests'] / elapsed:>8.1f} "
+                f"{ceiling:>10}  {dict(statuses)}"
+            )
+
+    def run_sync(self, user, order, options):
+        factory = APIRequestFactory()
+        view = getattr(views, options['view'])
+
+        def call(_):
+            request = factory.post('/api/payments/', {'order_id': str(order.order_id)}, format='json')
+            force_authenticate(request, user)
+            return view(request).status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            statuses = Counter(pool.map(call, range(options['requests'])))
+        return time.perf_counter() - start, statuses
+
+    async def run_async(self, user, order, options):
+        factory = AsyncRequestFactory()
+        view = getattr(async_views, options['view'])
+        token = str(AccessToken.for_user(user))
+        slots = asyncio.Semaphore(options['concurrency'])
+
+        async def call():
+            async with slots:
+                request = factory.post('/api/payments/', {'order_id': str(order.order_id)},
+                                       content_type='application/json', headers={'Authorization': f'Bearer {token}'})
+                return (await view(request)).status_code
+
+        start = time.perf_counter()
+        statuses = Counter(await asyncio.gather(*(call() for _ in range(options['requests']))))
+        return time.perf_counter() - start, statuses
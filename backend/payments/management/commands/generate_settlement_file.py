@@ -0,0 +1,80 @@
+import csv
+import json
+import random
+import uuid
+import zlib
+from collections import Counter
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from orders.models import Payment
+from payments.reconcile import classify
+
+
+class Command(BaseCommand):
+    help = ('Write a settlement file from the recorded payments, with a known number of injected '
+            'mismatches, to exercise reconcile_payments')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--mismatch-rate', type=float, default=0.01,
+                            help='Fraction of payments written with a wrong amount or a failed status')
+        parser.add_argument('--drop-rate', type=float, default=0,
+                            help='Fraction of payments left out of the file, reported as missing_settlement')
+        parser.add_argument('--unknown', type=int, default=0,
+                            help='Extra rows for transactions that have no Payment')
+        parser.add_argument('--repeat', type=int, default=1,
+                            help='Write every payment this many times, to build large files from a small database')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+        rng = random.Random(options['seed'])
+        expected = Counter()
+
+        with open(path, 'w', newline='', encoding='utf-8') as handle:
+            if file_format == 'csv':
+                writer = csv.writer(handle)
+                writer.writerow(['transaction_id', 'amount', 'status'])
+                write = writer.writerow
+            else:
+                def write(row):
+                    handle.write(json.dumps(dict(zip(('transaction_id', 'amount', 'status'), row))) + '\n')
+
+            payments = Payment.objects.exclude(transaction_id=None).values_list(
+                'transaction_id', 'amount', 'status', 'order__payment_status', 'created_at'
+            )
+            first = last = None
+            for repeat in range(options['repeat']):
+                for transaction_id, amount, payment_status, order_payment_status, created_at in payments.iterator(
+                    chunk_size=2000
+                ):
+                    first, last = min(first or created_at, created_at), max(last or created_at, created_at)
+                    # The same payments on every repeat, so the file never settles them
+                    if zlib.crc32(f"{options['seed']}:{transaction_id}".encode()) / 2 ** 32 < options['drop_rate']:
+                        if repeat == 0 and payment_status == 'success':
+                            expected['missing_settlement'] += 1
+                        continue
+                    settled_amount, settled_status = amount, 'succeeded'
+                    if rng.random() < options['mismatch_rate']:
+                        if rng.random() < 0.5:
+                            settled_amount += Decimal('1.00')
+                        else:
+                            settled_status = 'failed'
+                    write([transaction_id, str(settled_amount), settled_status])
+                    problem = classify(settled_amount, settled_status, amount, payment_status, order_payment_status)
+                    expected[problem or 'matched'] += 1
+
+            for _ in range(options['unknown']):
+                write([f'unknown_{uuid.UUID(int=rng.getrandbits(128)).hex}', '100.00', 'succeeded'])
+                expected['missing_payment'] += 1
+
+        rows = sum(count for problem, count in expected.items() if problem != 'missing_settlement')
+        self.stdout.write(self.style.SUCCESS(f'Wrote {rows} rows to {path}'))
+        for problem, count in sorted(expected.items()):
+            self.stdout.write(f'  expected {problem}: {count}')
+        if first is not None:
+            # The default period starts and ends at payments in the file, which a dropped payment may not be
+            self.stdout.write(f'  exact with: --since {first.isoformat()} --until {last.isoformat()}')
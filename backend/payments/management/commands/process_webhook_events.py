@@ -0,0 +1,45 @@
+import logging
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from payments.webhooks import process_events
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Apply received payment webhooks to orders and payments in batches until stopped (SIGINT/SIGTERM)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when no event is waiting')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when no event is waiting')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        handled = 0
+        while not self.stopping:
+            close_old_connections()
+            try:
+                events = process_events(options['batch_size'])
+            except Exception:
+                # The batch rolled back and stays queued; try it again after a pause
+                logger.exception('Processing webhook events failed')
+                events = []
+                if options['once']:
+                    raise
+            handled += len(events)
+            if not events:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Handled {handled} webhook events'))
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,76 @@
+import time
+from datetime import datetime, time as day_time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from orders.models import Payment
+from payments.reconcile import Reconciler, read_settlement_csv, read_settlement_jsonl
+
+
+class Command(BaseCommand):
+    help = ('Stream a gateway settlement or export file (CSV or JSON lines) and write a CSV report '
+            'of rows that do not match the recorded payments and orders')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--report', help='Defaults to <path>.mismatches.csv')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--id-column', default='transaction_id',
+                            help='Column holding the gateway id stored in Payment.transaction_id')
+        parser.add_argument('--amount-column', default='amount')
+        parser.add_argument('--status-column', default='status')
+        parser.add_argument('--minor-units', action='store_true',
+                            help='Amounts are in paise/cents rather than rupees')
+        parser.add_argument('--since', help='Start of the settlement period (date or datetime) for the '
+                                            'missing_settlement check; defaults to the oldest payment in the file')
+        parser.add_argument('--until', help='End of the settlement period, inclusive; defaults to the newest '
+                                            'payment in the file')
+        parser.add_argument('--payment-method', action='append',
+                            choices=[choice for choice, _ in Payment.PAYMENT_METHOD_CHOICES],
+                            help='Payment methods the file covers; defaults to those of the payments in the file')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+        report_path = options['report'] or f'{path}.mismatches.csv'
+
+        start = time.perf_counter()
+        with open(path, newline='', encoding='utf-8') as handle, \
+                open(report_path, 'w', newline='', encoding='utf-8') as report:
+            reconciler = Reconciler(
+                report, chunk_size=options['chunk_size'], id_column=options['id_column'],
+                amount_column=options['amount_column'], status_column=options['status_column'],
+                minor_units=options['minor_units'], since=self.parse_time(options['since']),
+                until=self.parse_time(options['until'], end_of_day=True),
+                payment_methods=options['payment_method'],
+            )
+            rows = read_settlement_jsonl(handle) if file_format == 'jsonl' else read_settlement_csv(handle)
+            stats = reconciler.run(rows)
+
+        elapsed = time.perf_counter() - start
+        problems = {key: count for key, count in sorted(stats.items()) if key not in ('rows', 'matched')}
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {stats['rows']} rows in {elapsed:.1f}s "
+            f"({stats['rows'] / max(elapsed, 1e-9):.0f} rows/s): {stats['matched']} matched"
+        ))
+        for problem, count in problems.items():
+            self.stdout.write(f'  {problem}: {count}')
+        self.stdout.write(f'Report written to {report_path}')
+
+    def parse_time(self, value, end_of_day=False):
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f'Invalid date or datetime: {value}')
+            parsed = datetime.combine(day, day_time.max if end_of_day else day_time.min)
+        if settings.USE_TZ and timezone.is_naive(parsed):
+            return timezone.make_aware(parsed)
+        if not settings.USE_TZ and timezone.is_aware(parsed):
+            return timezone.make_naive(parsed)
+        return parsed
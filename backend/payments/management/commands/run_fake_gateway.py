@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from payments.fake_gateway import make_fake_gateway
+
+
+class Command(BaseCommand):
+    help = ('Run a local stand-in for the Stripe and Razorpay APIs with configurable latency '
+            'and failures. Set STRIPE_API_BASE and RAZORPAY_API_BASE to its address.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=50, help='Base response time in ms')
+        parser.add_argument('--jitter', type=float, default=50, help='Random extra ms added to each response')
+        parser.add_argument('--error-rate', type=float, default=0, help='Fraction of requests answered with a 500')
+        parser.add_argument('--hang-rate', type=float, default=0,
+                            help='Fraction of requests that stall for --hang seconds first')
+        parser.add_argument('--hang', type=float, default=60)
+
+    def handle(self, *args, **options):
+        server = make_fake_gateway(
+            options['host'], options['port'], verbose=options['verbosity'] > 1,
+            **{key: options[key] for key in ('latency', 'jitter', 'error_rate', 'hang_rate', 'hang')}
+        )
+
+        address = f"http://{options['host']}:{server.server_address[1]}"
+        self.stdout.write(f'Fake gateway listening on {address}')
+        self.stdout.write(f'  STRIPE_API_BASE={address} RAZORPAY_API_BASE={address}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,58 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from users.models import User
+
+
+class IdempotencyKey(models.Model):
+    """The stored outcome of a request sent with an Idempotency-Key header"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    endpoint = models.CharField(max_length=100)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)  # null while in progress
+    response = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'idempotency_keys'
+        unique_together = ['user', 'endpoint', 'key']
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_keys_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.endpoint} {self.key}'
+
+
+class WebhookEvent(models.Model):
+    """A gateway webhook as received; applied to orders by `process_webhook_events`"""
+    GATEWAY_CHOICES = (
+        ('stripe', 'Stripe'),
+        ('razorpay', 'Razorpay'),
+    )
+
+    STATUS_CHOICES = (
+        ('received', 'Received'),
+        ('processed', 'Processed'),
+        ('ignored', 'Ignored'),
+    )
+
+    gateway = models.CharField(max_length=20, choices=GATEWAY_CHOICES)
+    event_id = models.CharField(max_length=255)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='received')
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'webhook_events'
+        # Gateways deliver at least once; the second copy of an event is dropped on insert
+        unique_together = ['gateway', 'event_id']
+        indexes = [
+            models.Index(fields=['status', 'received_at'], name='webhook_events_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.gateway} {self.event_type} {self.event_id}'
@@ -0,0 +1,160 @@
+import csv
+import json
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from orders.models import Payment
+
+REPORT_COLUMNS = [
+    'row', 'transaction_id', 'problem', 'settled_amount', 'recorded_amount',
+    'settled_status', 'payment_status', 'order_payment_status',
+]
+SETTLED_STATUSES = {'', 'succeeded', 'success', 'paid', 'captured', 'settled', 'processed'}
+# Connection-local table of the ids seen in the file, for the reverse pass
+SEEN_TABLE = 'reconcile_seen_transactions'
+
+
+def classify(settled_amount, settled_status, amount, payment_status, order_payment_status):
+    """The problem with a settled row whose payment was found, or None when it matches"""
+    settled = settled_status in SETTLED_STATUSES
+    if amount != settled_amount:
+        return 'amount_mismatch'
+    if settled and (payment_status != 'success' or order_payment_status != 'paid'):
+        return 'not_marked_paid'
+    if not settled and payment_status == 'success':
+        return 'not_settled'
+    return None
+
+
+def read_settlement_csv(handle):
+    yield from csv.DictReader(handle)
+
+
+def read_settlement_jsonl(handle):
+    for line in handle:
+        if line.strip():
+            yield json.loads(line)
+
+
+class Reconciler:
+    """
+    Compares settlement rows with Payment and Order.payment_status.
+
+    Rows are buffered `chunk_size` at a time and looked up with one query
+    on the indexed Payment.transaction_id per chunk, and every mismatch is
+    written to the report as soon as it is found, so memory use does not
+    grow with the size of the file.
+
+    The ids seen are also written to a temporary table. When the file is
+    done, successful payments created between `since` and `until` whose id
+    is not in it are reported as missing_settlement. The period defaults to
+    the creation times of the payments found in the file, and the payment
+    methods to theirs.
+    """
+
+    def __init__(self, report, chunk_size=500, id_column='transaction_id', amount_column='amount',
+                 status_column='status', minor_units=False, since=None, until=None, payment_methods=None):
+        self.writer = csv.writer(report)
+        self.writer.writerow(REPORT_COLUMNS)
+        self.chunk_size = chunk_size
+        self.id_column = id_column
+        self.amount_column = amount_column
+        self.status_column = status_column
+        self.minor_units = minor_units
+        self.since = since
+        self.until = until
+        self.payment_methods = set(payment_methods or ())
+        self.infer_methods = not self.payment_methods
+        self.first_seen = self.last_seen = None
+        self.stats = Counter()
+
+    def run(self, rows):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SEEN_TABLE}')
+            cursor.execute(f'CREATE TEMPORARY TABLE {SEEN_TABLE} (transaction_id varchar(200) NOT NULL)')
+        try:
+            chunk = []
+            for line, row in enumerate(rows, start=1):
+                chunk.append((line, row))
+                if len(chunk) >= self.chunk_size:
+                    self.reconcile_chunk(chunk)
+                    chunk = []
+            if chunk:
+                self.reconcile_chunk(chunk)
+
+            with connection.cursor() as cursor:
+                cursor.execute(f'CREATE INDEX {SEEN_TABLE}_idx ON {SEEN_TABLE} (transaction_id)')
+            self.report_unsettled()
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS {SEEN_TABLE}')
+        return self.stats
+
+    def parse_amount(self, value):
+        amount = Decimal(str(value).strip())
+        return amount / 100 if self.minor_units else amount
+
+    def reconcile_chunk(self, chunk):
+        ids = {str(row.get(self.id_column) or '').strip() for _, row in chunk} - {''}
+        with connection.cursor() as cursor:
+            cursor.executemany(f'INSERT INTO {SEEN_TABLE} (transaction_id) VALUES (%s)', [(i,) for i in ids])
+
+        recorded = {}
+        for transaction_id, amount, payment_status, order_payment_status, method, created_at in Payment.objects.filter(
+            transaction_id__in=ids
+        ).values_list('transaction_id', 'amount', 'status', 'order__payment_status', 'payment_method', 'created_at'):
+            recorded[transaction_id] = (amount, payment_status, order_payment_status)
+            self.seen_payment(method, created_at)
+
+        for line, row in chunk:
+            self.stats['rows'] += 1
+            transaction_id = str(row.get(self.id_column) or '').strip()
+            settled_status = str(row.get(self.status_column) or '').strip().lower()
+            try:
+                settled_amount = self.parse_amount(row.get(self.amount_column))
+            except (InvalidOperation, ValueError, TypeError):
+                settled_amount = None
+
+            if not transaction_id or settled_amount is None:
+                self.report(line, transaction_id, 'invalid_row', row.get(self.amount_column), settled_status)
+                continue
+            if transaction_id not in recorded:
+                self.report(line, transaction_id, 'missing_payment', settled_amount, settled_status)
+                continue
+
+            amount, payment_status, order_payment_status = recorded[transaction_id]
+            problem = classify(settled_amount, settled_status, amount, payment_status, order_payment_status)
+            if problem is None:
+                self.stats['matched'] += 1
+                continue
+            self.report(line, transaction_id, problem, settled_amount, settled_status,
+                        amount, payment_status, order_payment_status)
+
+    def seen_payment(self, method, created_at):
+        if self.infer_methods:
+            self.payment_methods.add(method)
+        if self.first_seen is None or created_at < self.first_seen:
+            self.first_seen = created_at
+        if self.last_seen is None or created_at > self.last_seen:
+            self.last_seen = created_at
+
+    def report_unsettled(self):
+        since, until = self.since or self.first_seen, self.until or self.last_seen
+        if since is None or until is None:
+            return
+        unsettled = Payment.objects.filter(
+            status='success', payment_method__in=self.payment_methods,
+            created_at__gte=since, created_at__lte=until,
+        ).exclude(
+            transaction_id__in=RawSQL(f'SELECT transaction_id FROM {SEEN_TABLE}', [])
+        ).values_list('transaction_id', 'amount', 'status', 'order__payment_status').order_by('created_at', 'pk')
+        for transaction_id, amount, payment_status, order_payment_status in unsettled.iterator(chunk_size=2000):
+            self.report('', transaction_id, 'missing_settlement', '', '', amount, payment_status, order_payment_status)
+
+    def report(self, line, transaction_id, problem, settled_amount, settled_status,
+               recorded_amount='', payment_status='', order_payment_status=''):
+        self.stats[problem] += 1
+        self.writer.writerow([line, transaction_id, problem, settled_amount, recorded_amount,
+                              settled_status, payment_status, order_payment_status])
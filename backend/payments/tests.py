@@ -0,0 +1,77 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncRequestFactory, TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import async_views, views
+from .models import IdempotencyKey, WebhookEvent
+
+User = get_user_model()
+
+
+class MalformedOrderIdTests(TestCase):
+    """A non-UUID order_id is a bad request, not a server error"""
+
+    CONFIRM = {'order_id': 'not-a-uuid', 'payment_intent_id': 'pi_1'}
+    VERIFY = {'order_id': 'not-a-uuid', 'razorpay_order_id': 'order_1',
+              'razorpay_payment_id': 'pay_1', 'razorpay_signature': 'signature'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='payer@example.com', username='payer', password=None)
+
+    def post(self, view, data, key):
+        request = APIRequestFactory().post('/api/payments/', data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+        force_authenticate(request, self.user)
+        return view(request)
+
+    async def apost(self, view, data, key):
+        request = AsyncRequestFactory().post('/api/payments/', data, content_type='application/json', headers={
+            'Authorization': f'Bearer {AccessToken.for_user(self.user)}', 'Idempotency-Key': key,
+        })
+        return await view(request)
+
+    def assert_bad_request(self, response, key):
+        self.assertEqual(response.status_code, 400)
+        # 400 is a final answer, so the key keeps it for retries
+        self.assertEqual(IdempotencyKey.objects.get(key=key).status_code, 400)
+
+    def test_confirm_payment(self):
+        self.assert_bad_request(self.post(views.confirm_payment, self.CONFIRM, 'confirm'), 'confirm')
+
+    def test_verify_razorpay_payment(self):
+        self.assert_bad_request(self.post(views.verify_razorpay_payment, self.VERIFY, 'verify'), 'verify')
+
+    async def test_async_confirm_payment(self):
+        response = await self.apost(async_views.confirm_payment, self.CONFIRM, 'async-confirm')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((await IdempotencyKey.objects.aget(key='async-confirm')).status_code, 400)
+
+    async def test_async_verify_razorpay_payment(self):
+        response = await self.apost(async_views.verify_razorpay_payment, self.VERIFY, 'async-verify')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((await IdempotencyKey.objects.aget(key='async-verify')).status_code, 400)
+
+
+class RazorpayWebhookTests(TestCase):
+    def post(self, event):
+        request = APIRequestFactory().post('/api/payments/webhooks/razorpay/', json.dumps(event),
+                                           content_type='application/json', HTTP_X_RAZORPAY_EVENT_ID='evt_1',
+                                           HTTP_X_RAZORPAY_SIGNATURE='signature')
+        # Only the parsing is under test; the signature is taken as valid
+        with mock.patch.object(views, 'get_razorpay') as get_razorpay:
+            get_razorpay.return_value.verify_webhook.return_value = None
+            return views.razorpay_webhook(request)
+
+    def test_signed_body_that_is_not_an_object(self):
+        for body in ([{'event': 'payment.captured'}], 'payment.captured', 42, None):
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body).status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_signed_event_is_stored(self):
+        self.assertEqual(self.post({'event': 'payment.captured', 'payload': {}}).status_code, 200)
+        self.assertEqual(WebhookEvent.objects.get().event_type, 'payment.captured')
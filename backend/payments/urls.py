@@ -1,11 +1,19 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if settings.ASYNC_PAYMENT_VIEWS:
+    from . import async_views as gateway_views
+else:
+    gateway_views = views
+
 app_name = 'payments'
 
 urlpatterns = [
-    path('create-payment-intent/', views.create_payment_intent, name='create-payment-intent'),
-    path('confirm-payment/', views.confirm_payment, name='confirm-payment'),
-    path('razorpay/create/', views.create_razorpay_order, name='razorpay-create'),
-    path('razorpay/verify/', views.verify_razorpay_payment, name='razorpay-verify'),
+    path('create-payment-intent/', gateway_views.create_payment_intent, name='create-payment-intent'),
+    path('confirm-payment/', gateway_views.confirm_payment, name='confirm-payment'),
+    path('razorpay/create/', gateway_views.create_razorpay_order, name='razorpay-create'),
+    path('razorpay/verify/', gateway_views.verify_razorpay_payment, name='razorpay-verify'),
+    path('webhooks/stripe/', views.stripe_webhook, name='stripe-webhook'),
+    path('webhooks/razorpay/', views.razorpay_webhook, name='razorpay-webhook'),
 ]
@@ -1,15 +1,70 @@
-import stripe
+import json
+import logging
 import razorpay
+import stripe
 from django.conf import settings
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from django.core.exceptions import ValidationError
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from orders.models import Order, Payment
-from orders.utils import send_invoice_email
+from django.db import transaction
+from jobs.queue import enqueue
+from orders.tasks import send_invoice
+from .clients import GatewayFailure, InvalidSignature, get_razorpay, get_stripe
+from .idempotency import idempotent
+from .webhooks import record_event
+
+logger = logging.getLogger(__name__)
+
+# invoice_sent is kept for existing clients; the email now goes out from the job queue
+PAYMENT_CONFIRMED = {'message': 'Payment confirmed successfully', 'invoice_sent': True, 'invoice_queued': True}
+
+
+def recorded_payments(request, transaction_id):
+    """The Payment an earlier confirmation of this transaction stored, if any"""
+    return Payment.objects.filter(
+        transaction_id=transaction_id, order__order_id=request.data.get('order_id'), order__user=request.user
+    )
+
+def already_recorded(request, transaction_id):
+    """A repeated confirmation: an earlier request already stored this payment"""
+    return bool(transaction_id) and recorded_payments(request, transaction_id).exists()
 
+class OrderAlreadyPaid(Exception):
+    """The order has a Payment for another transaction; the new charge needs a refund"""
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
+
+def record_payment(user, order_id, payment_method, transaction_id, queue_invoice=False):
+    """Mark the order paid and store its Payment in one transaction"""
+    with transaction.atomic():
+        # Locked like process_events() locks it, so a webhook for the same order waits
+        order = Order.objects.select_for_update().get(order_id=order_id, user=user)
+        paid_with = Payment.objects.filter(order=order).values_list('transaction_id', flat=True).first()
+        if paid_with == transaction_id:
+            # A webhook recorded this payment first
+            return
+        if paid_with is not None:
+            logger.warning('Order %s was already paid with %s; %s %s needs a refund',
+                           order.order_id, paid_with, payment_method, transaction_id)
+            raise OrderAlreadyPaid('Order already paid with another transaction')
+        order.payment_status = 'paid'
+        order.payment_transaction_id = transaction_id
+        order.status = 'confirmed'
+        order.save()
+        
+        # Create payment record
+        Payment.objects.create(
+            order=order,
+            amount=order.final_amount,
+            payment_method=payment_method,
+            transaction_id=transaction_id,
+            status='success'
+        )
+
+        if queue_invoice:
+            enqueue(send_invoice, {'order_id': order.pk, 'invoice_type': 'payment_confirmation'})
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -18,7 +73,7 @@ def create_payment_intent(request):
         order_id = request.data.get('order_id')
         order = Order.objects.get(order_id=order_id, user=request.user)
         
-        intent = stripe.PaymentIntent.create(
+        intent = get_stripe().create_payment_intent(
             amount=int(order.final_amount * 100),  # Amount in cents
             currency='inr',
             metadata={'order_id': str(order.order_id)}
@@ -30,54 +85,48 @@ def create_payment_intent(request):
         })
     except Order.DoesNotExist:
         return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+    except GatewayFailure as e:
+        return Response({'error': str(e)}, status=e.status_code)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def confirm_payment(request):
     try:
         payment_intent_id = request.data.get('payment_intent_id')
         order_id = request.data.get('order_id')
+        if already_recorded(request, payment_intent_id):
+            return Response(PAYMENT_CONFIRMED)
         
         # Verify payment with Stripe
-        intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+        intent = get_stripe().retrieve_payment_intent(payment_intent_id)
         
         if intent.status == 'succeeded':
-            order = Order.objects.get(order_id=order_id, user=request.user)
-            order.payment_status = 'paid'
-            order.payment_transaction_id = payment_intent_id
-            order.status = 'confirmed'
-            order.save()
-            
-            # Create payment record
-            Payment.objects.create(
-                order=order,
-                amount=order.final_amount,
-                payment_method='stripe',
-                transaction_id=payment_intent_id,
-                status='success'
-            )
-
-            send_invoice_email(order, "payment_confirmation")
-            
-            return Response({'message': 'Payment confirmed successfully', 'invoice_sent': True})
-        else:
+            record_payment(request.user, order_id, 'stripe', payment_intent_id, queue_invoice=True)
+            return Response(PAYMENT_CONFIRMED)
+        elif intent.status == 'canceled':
             return Response({'error': 'Payment failed'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            return Response({'error': 'Payment is not complete yet', 'payment_status': intent.status},
+                            status=status.HTTP_409_CONFLICT)
             
-    except Exception as e:
+    except GatewayFailure as e:
+        return Response({'error': str(e)}, status=e.status_code)
+    except OrderAlreadyPaid as e:
+        return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+    except (Order.DoesNotExist, ValidationError, stripe.error.InvalidRequestError) as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_razorpay_order(request):
     try:
-        client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-        
         order_id = request.data.get('order_id')
         order = Order.objects.get(order_id=order_id, user=request.user)
         
-        razorpay_order = client.order.create({
+        razorpay_order = get_razorpay().create_order({
             'amount': int(order.final_amount * 100),
             'currency': 'INR',
             'notes': {
@@ -93,41 +142,69 @@ def create_razorpay_order(request):
         })
     except Order.DoesNotExist:
         return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+    except GatewayFailure as e:
+        return Response({'error': str(e)}, status=e.status_code)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def verify_razorpay_payment(request):
     try:
-        client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-        
         payment_data = {
             'razorpay_order_id': request.data.get('razorpay_order_id'),
             'razorpay_payment_id': request.data.get('razorpay_payment_id'),
             'razorpay_signature': request.data.get('razorpay_signature')
         }
+        if already_recorded(request, payment_data['razorpay_payment_id']):
+            return Response({'message': 'Payment verified successfully'})
         
         # Verify signature
-        client.utility.verify_payment_signature(payment_data)
-        
-        order_id = request.data.get('order_id')
-        order = Order.objects.get(order_id=order_id, user=request.user)
-        order.payment_status = 'paid'
-        order.payment_transaction_id = payment_data['razorpay_payment_id']
-        order.status = 'confirmed'
-        order.save()
+        get_razorpay().verify_payment_signature(payment_data)
         
-        # Create payment record
-        Payment.objects.create(
-            order=order,
-            amount=order.final_amount,
-            payment_method='razorpay',
-            transaction_id=payment_data['razorpay_payment_id'],
-            status='success'
-        )
+        record_payment(request.user, request.data.get('order_id'), 'razorpay', payment_data['razorpay_payment_id'])
         
         return Response({'message': 'Payment verified successfully'})
         
-    except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+    except OrderAlreadyPaid as e:
+        return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+    except (Order.DoesNotExist, ValidationError, razorpay.errors.SignatureVerificationError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+# Webhooks are only verified and stored here; `process_webhook_events`
+# applies them to orders in batches.
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def stripe_webhook(request):
+    body = request.body
+    try:
+        get_stripe().verify_webhook(body, request.headers.get('Stripe-Signature', ''))
+        event = json.loads(body)
+        event_id = event['id']
+    except (InvalidSignature, ValueError, KeyError, TypeError):
+        return Response({'error': 'Invalid webhook'}, status=status.HTTP_400_BAD_REQUEST)
+
+    record_event('stripe', event_id, event.get('type', ''), event)
+    return Response({'received': True})
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def razorpay_webhook(request):
+    body = request.body
+    event_id = request.headers.get('X-Razorpay-Event-Id')
+    try:
+        get_razorpay().verify_webhook(body, request.headers.get('X-Razorpay-Signature', ''))
+        event = json.loads(body)
+    except (InvalidSignature, ValueError):
+        return Response({'error': 'Invalid webhook'}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(event, dict):
+        return Response({'error': 'Invalid webhook'}, status=status.HTTP_400_BAD_REQUEST)
+    if not event_id:
+        return Response({'error': 'Missing X-Razorpay-Event-Id'}, status=status.HTTP_400_BAD_REQUEST)
+
+    record_event('razorpay', event_id, event.get('event', ''), event)
+    return Response({'received': True})
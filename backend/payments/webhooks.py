@@ -0,0 +1,141 @@
+import logging
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+from jobs.queue import enqueue
+from orders.models import Order, Payment
+from orders.tasks import send_invoice
+
+from .models import WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+
+def record_event(gateway, event_id, event_type, payload):
+    """Store a verified event; a redelivered event id is dropped by the unique index"""
+    WebhookEvent.objects.bulk_create([
+        WebhookEvent(gateway=gateway, event_id=event_id, event_type=event_type, payload=payload)
+    ], ignore_conflicts=True)
+
+
+def stripe_outcome(payload):
+    intent = (payload.get('data') or {}).get('object') or {}
+    outcome = {
+        'payment_intent.succeeded': 'paid',
+        'payment_intent.payment_failed': 'failed',
+    }.get(payload.get('type'))
+    return outcome, (intent.get('metadata') or {}).get('order_id'), intent.get('id')
+
+
+def razorpay_outcome(payload):
+    # Entities a given event does not carry may be missing or null
+    entities = payload.get('payload') or {}
+    payment = (entities.get('payment') or {}).get('entity') or {}
+    order = (entities.get('order') or {}).get('entity') or {}
+    outcome = {
+        'payment.captured': 'paid',
+        'order.paid': 'paid',
+        'payment.failed': 'failed',
+    }.get(payload.get('event'))
+    # Our order id is in the notes create_razorpay_order puts on the Razorpay order
+    notes = payment.get('notes') or order.get('notes') or {}
+    return outcome, notes.get('order_id') if isinstance(notes, dict) else None, payment.get('id')
+
+
+OUTCOME_PARSERS = {
+    'stripe': stripe_outcome,
+    'razorpay': razorpay_outcome,
+}
+
+
+def parse_event(event):
+    """(outcome, order uuid, transaction id), or None for events that do not change an order"""
+    outcome, order_id, transaction_id = OUTCOME_PARSERS[event.gateway](event.payload)
+    if outcome is None or not transaction_id:
+        return None
+    try:
+        return outcome, uuid.UUID(str(order_id)), transaction_id
+    except ValueError:
+        return None
+
+
+def apply_event(event, order, outcome, transaction_id, now):
+    """Apply one parsed event to its locked order"""
+    changes = {}
+    if outcome == 'paid' and order.payment_status != 'paid':
+        changes = {'payment_status': 'paid', 'status': 'confirmed', 'payment_transaction_id': transaction_id}
+    elif outcome == 'failed' and order.payment_status == 'pending':
+        changes = {'payment_status': 'failed'}
+    if changes:
+        Order.objects.filter(pk=order.pk).update(updated_at=now, **changes)
+
+    # confirm_payment may have recorded the payment already
+    payment = None
+    if outcome == 'paid' and not hasattr(order, 'payment'):
+        payment = Payment.objects.create(
+            order=order, amount=order.final_amount, payment_method=event.gateway,
+            transaction_id=transaction_id, status='success'
+        )
+        enqueue(send_invoice, {'order_id': order.pk, 'invoice_type': 'payment_confirmation'})
+
+    # Only once the savepoint holds, so a failed event leaves the batch's copy untouched
+    for field, value in changes.items():
+        setattr(order, field, value)
+    if payment is not None:
+        order.payment = payment
+
+
+@transaction.atomic
+def process_events(limit=100):
+    """
+    Apply up to `limit` received events, oldest first. Their orders are
+    loaded and locked with one query, so confirm_payment cannot change an
+    order while the batch does. Each event is applied in its own savepoint:
+    one that cannot be parsed or applied is marked ignored with the error,
+    and the rest of the batch goes through. Returns the events handled.
+    """
+    events = list(
+        WebhookEvent.objects.select_for_update(skip_locked=True)
+        .filter(status='received').order_by('received_at', 'id')[:limit]
+    )
+    if not events:
+        return events
+
+    parsed = {}
+    for event in events:
+        try:
+            parsed[event.pk] = parse_event(event)
+        except Exception as e:
+            parsed[event.pk] = e
+    orders = Order.objects.select_for_update(of=('self',)).select_related('payment').in_bulk(
+        {update[1] for update in parsed.values() if isinstance(update, tuple)}, field_name='order_id'
+    )
+
+    now = timezone.now()
+    for event in events:
+        update = parsed[event.pk]
+        event.processed_at = now
+        if isinstance(update, Exception):
+            event.status, event.error = 'ignored', f'Malformed payload: {update!r}'
+            continue
+        if update is None:
+            event.status = 'ignored'
+            continue
+        outcome, order_id, transaction_id = update
+        order = orders.get(order_id)
+        if order is None:
+            event.status, event.error = 'ignored', 'Unknown order'
+            continue
+
+        try:
+            with transaction.atomic():
+                apply_event(event, order, outcome, transaction_id, now)
+        except Exception as e:
+            logger.exception('Applying webhook event %s failed', event.pk)
+            event.status, event.error = 'ignored', repr(e)
+        else:
+            event.status = 'processed'
+
+    WebhookEvent.objects.bulk_update(events, ['status', 'error', 'processed_at'])
+    return events
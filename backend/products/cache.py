@@ -0,0 +1,106 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Product
+from .serializers import ProductListSerializer
+
+CATALOG_VERSION_KEY = 'catalog:version'
+FEATURED_PRODUCTS_KEY = 'featured-products'
+FEATURED_PRODUCTS_LIMIT = 8
+
+
+def product_cache():
+    return caches[settings.PRODUCT_CACHE_ALIAS]
+
+
+def version_key(kind, pk):
+    return f'catalog:version:{kind}:{pk}'
+
+
+def get_versions(keys):
+    """
+    Current version token for each key. A missing token (never set, or
+    evicted) is replaced by a fresh random one, so an eviction can never make
+    an old ETag valid again.
+    """
+    cache = product_cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            token = uuid.uuid4().hex
+            versions[key] = token if cache.add(key, token, None) else cache.get(key, token)
+    return versions
+
+
+def bump_versions(keys):
+    product_cache().set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+
+def bump_product_versions(product_ids):
+    bump_versions([version_key('product', pk) for pk in product_ids])
+
+
+def bump_catalog_version():
+    """Invalidate every cached product at once, e.g. after a bulk import"""
+    bump_versions([CATALOG_VERSION_KEY])
+
+
+# Product detail responses
+
+def product_detail_meta_key(pk):
+    return f'product-detail:meta:{pk}'
+
+
+def product_detail_keys(pk, meta=None):
+    keys = [CATALOG_VERSION_KEY, version_key('product', pk)]
+    if meta:
+        keys += [version_key('category', meta['category']), version_key('brand', meta['brand'])]
+    return keys
+
+
+def product_detail_etag(pk, host, versions):
+    digest = hashlib.sha1(
+        ':'.join([str(pk), host] + [versions[key] for key in sorted(versions)]).encode()
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def product_detail_payload_key(etag):
+    return 'product-detail:payload:' + etag.strip('"')
+
+
+# Featured products
+
+def build_featured_products():
+    """Serialize the featured list and store it until the next relevant change"""
+    products = Product.objects.filter(is_active=True, is_featured=True).for_listing()[:FEATURED_PRODUCTS_LIMIT]
+    data = ProductListSerializer(products, many=True).data
+    product_cache().set(FEATURED_PRODUCTS_KEY, data, None)
+    return data
+
+
+def get_featured_products():
+    data = product_cache().get(FEATURED_PRODUCTS_KEY)
+    if data is None:
+        data = build_featured_products()
+    return data
+
+
+def featured_product_ids():
+    """Ids in the stored payload, without touching the database"""
+    return {item['id'] for item in product_cache().get(FEATURED_PRODUCTS_KEY) or []}
+
+
+def schedule_featured_rebuild():
+    transaction.on_commit(build_featured_products)
+
+
+def invalidate_stock(product_ids):
+    """Stock was changed with a bulk UPDATE, which sends no signals"""
+    bump_product_versions(product_ids)
+    if featured_product_ids() & set(product_ids):
+        build_featured_products()
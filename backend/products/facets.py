@@ -0,0 +1,54 @@
+from django.db.models import Count
+
+from .models import ProductSpecification, SpecificationFacet
+
+SPEC_FILTER_PREFIX = 'spec_'
+
+
+def filter_by_specs(queryset, query_params):
+    """Apply ?spec_<name>=<value> filters; each one must match (AND)"""
+    for key, value in query_params.items():
+        if key.startswith(SPEC_FILTER_PREFIX) and value:
+            queryset = queryset.filter(
+                specifications__spec_name=key[len(SPEC_FILTER_PREFIX):],
+                specifications__spec_value=value
+            )
+    return queryset
+
+
+def refresh_facets(pairs):
+    """Recount only the given (spec_name, spec_value) pairs"""
+    for spec_name, spec_value in set(pairs):
+        product_count = ProductSpecification.objects.filter(
+            spec_name=spec_name, spec_value=spec_value, product__is_active=True
+        ).count()
+        if product_count:
+            SpecificationFacet.objects.update_or_create(
+                spec_name=spec_name, spec_value=spec_value,
+                defaults={'product_count': product_count}
+            )
+        else:
+            SpecificationFacet.objects.filter(spec_name=spec_name, spec_value=spec_value).delete()
+
+
+def rebuild_facets():
+    counts = ProductSpecification.objects.filter(product__is_active=True).values(
+        'spec_name', 'spec_value'
+    ).annotate(product_count=Count('id')).order_by()
+
+    SpecificationFacet.objects.all().delete()
+    SpecificationFacet.objects.bulk_create(
+        [SpecificationFacet(**row) for row in counts.iterator()],
+        batch_size=1000
+    )
+
+
+def facet_counts():
+    """{spec_name: [{'value': ..., 'count': ...}, ...]} read from the facet table"""
+    facets = {}
+    rows = SpecificationFacet.objects.order_by('spec_name', '-product_count', 'spec_value').values_list(
+        'spec_name', 'spec_value', 'product_count'
+    )
+    for spec_name, spec_value, product_count in rows:
+        facets.setdefault(spec_name, []).append({'value': spec_value, 'count': product_count})
+    return facets
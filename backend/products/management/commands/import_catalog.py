@@ -0,0 +1,206 @@
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from products.cache import bump_catalog_version, schedule_featured_rebuild
+from products.models import Brand, Category, Product, ProductImage, ProductSpecification
+from products.search import get_search_backend
+
+SPEC_COLUMN_PREFIX = 'spec:'
+IMAGE_SEPARATOR = '|'
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+def parse_decimal(value):
+    return Decimal(str(value).strip())
+
+
+FIELD_PARSERS = {
+    'name': str,
+    'description': str,
+    'short_description': str,
+    'product_type': str,
+    'price': parse_decimal,
+    'discount_percentage': parse_decimal,
+    'stock_quantity': int,
+    'min_stock_level': int,
+    'warranty_months': int,
+    'weight': parse_decimal,
+    'is_active': parse_bool,
+    'is_featured': parse_bool,
+}
+REQUIRED_FOR_CREATE = ('name', 'price', 'category', 'brand')
+
+
+def read_csv(handle):
+    for row in csv.DictReader(handle):
+        specs = {key[len(SPEC_COLUMN_PREFIX):]: value for key, value in row.items()
+                 if key.startswith(SPEC_COLUMN_PREFIX) and value}
+        images = [path for path in (row.pop('images', '') or '').split(IMAGE_SEPARATOR) if path]
+        row = {key: value for key, value in row.items() if not key.startswith(SPEC_COLUMN_PREFIX)}
+        row['specs'] = specs
+        row['images'] = images
+        yield row
+
+
+def read_jsonl(handle):
+    for line in handle:
+        if line.strip():
+            yield json.loads(line)
+
+
+class Command(BaseCommand):
+    help = ('Stream a CSV or JSON-lines catalog feed and upsert products, specifications '
+            'and image references by SKU in batches')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--skip-reindex', action='store_true',
+                            help='Do not rebuild the search index and facets afterwards')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+        batch_size = options['batch_size']
+
+        # Category and brand names are resolved in memory; the maps stay small
+        self.categories = dict(Category.objects.values_list('name', 'id'))
+        self.brands = dict(Brand.objects.values_list('name', 'id'))
+        self.stats = {'created': 0, 'updated': 0, 'skipped': 0}
+
+        start = time.perf_counter()
+        rows = 0
+        with open(path, newline='', encoding='utf-8') as handle:
+            reader = read_jsonl(handle) if file_format == 'jsonl' else read_csv(handle)
+            batch = {}
+            for row in reader:
+                sku = str(row.get('sku') or '').strip()
+                if not sku:
+                    self.stats['skipped'] += 1
+                    continue
+                batch[sku] = row  # last row wins for a repeated SKU
+                rows += 1
+                if len(batch) >= batch_size:
+                    self.import_batch(batch)
+                    batch = {}
+                    self.report(rows, start)
+            if batch:
+                self.import_batch(batch)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s): "
+            f"{self.stats['created']} created, {self.stats['updated']} updated, "
+            f"{self.stats['skipped']} skipped"
+        ))
+
+        # Bulk writes skip model signals, so refresh the derived data once here
+        bump_catalog_version()
+        schedule_featured_rebuild()
+        if not options['skip_reindex']:
+            if get_search_backend() is not None:
+                call_command('rebuild_search_index', stdout=self.stdout)
+            call_command('rebuild_facets', stdout=self.stdout)
+
+    def report(self, rows, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'{rows} rows, {rows / max(elapsed, 1e-9):.0f} rows/s')
+
+    def resolve(self, model, names_to_ids, name):
+        name = str(name).strip()
+        if name not in names_to_ids:
+            names_to_ids[name] = model.objects.get_or_create(name=name)[0].id
+        return names_to_ids[name]
+
+    @transaction.atomic
+    def import_batch(self, batch):
+        existing = {product.sku: product for product in Product.objects.filter(sku__in=batch.keys())}
+
+        products, update_fields = [], {'effective_price', 'updated_at'}
+        for sku, row in batch.items():
+            product = existing.get(sku)
+            if product is None and any(not row.get(field) for field in REQUIRED_FOR_CREATE):
+                self.stats['skipped'] += 1
+                continue
+            product = product or Product(sku=sku, description='')
+            try:
+                update_fields.update(self.apply_row(product, row))
+            except (InvalidOperation, ValueError, TypeError):
+                self.stats['skipped'] += 1
+                continue
+            product.set_effective_price()
+            self.stats['updated' if product.pk else 'created'] += 1
+            # Existing rows were loaded in full, so one INSERT ... ON CONFLICT (sku)
+            # upsert can write both new and changed products
+            product.pk = None
+            products.append(product)
+
+        Product.objects.bulk_create(
+            products, update_conflicts=True, unique_fields=['sku'], update_fields=sorted(update_fields)
+        )
+
+        product_ids = dict(Product.objects.filter(
+            sku__in=[product.sku for product in products]
+        ).values_list('sku', 'id'))
+        self.import_specs(batch, product_ids)
+        self.import_images(batch, product_ids)
+
+    def apply_row(self, product, row):
+        fields = []
+        for field, parser in FIELD_PARSERS.items():
+            value = row.get(field)
+            if value is None or value == '':
+                continue
+            setattr(product, field, parser(value))
+            fields.append(field)
+        if row.get('category'):
+            product.category_id = self.resolve(Category, self.categories, row['category'])
+            fields.append('category')
+        if row.get('brand'):
+            product.brand_id = self.resolve(Brand, self.brands, row['brand'])
+            fields.append('brand')
+        return fields
+
+    def import_specs(self, batch, product_ids):
+        specs = [
+            ProductSpecification(product_id=product_ids[sku], spec_name=name, spec_value=str(value))
+            for sku, row in batch.items() if sku in product_ids
+            for name, value in (row.get('specs') or {}).items()
+        ]
+        ProductSpecification.objects.bulk_create(
+            specs, update_conflicts=True,
+            unique_fields=['product', 'spec_name'], update_fields=['spec_value']
+        )
+
+    def import_images(self, batch, product_ids):
+        known = set(ProductImage.objects.filter(
+            product_id__in=product_ids.values()
+        ).values_list('product_id', 'image'))
+        has_images = {product_id for product_id, _ in known}
+
+        images = []
+        for sku, row in batch.items():
+            product_id = product_ids.get(sku)
+            if product_id is None:
+                continue
+            for path in row.get('images') or []:
+                if (product_id, path) in known:
+                    continue
+                images.append(ProductImage(
+                    product_id=product_id, image=path, is_primary=product_id not in has_images
+                ))
+                known.add((product_id, path))
+                has_images.add(product_id)
+        ProductImage.objects.bulk_create(images)
@@ -1,13 +1,79 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
-from products.models import Category, Brand, Product
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+from datetime import timedelta
+from products.cache import bump_catalog_version
+from products.models import Category, Brand, Product, ProductImage, ProductSpecification
+from orders.models import Cart, CartItem, Order, OrderItem, Payment
 from decimal import Decimal
+import random
+import time
+import uuid
 
 User = get_user_model()
 
+SKU_PREFIX = 'SMP-'
+CUSTOMER_EMAIL = 'customer{}@example.com'
+CUSTOMER_PASSWORD = 'customer123'
+
+PRODUCT_LINES = {
+    'Dell': ['Inspiron', 'XPS', 'Latitude', 'Alienware', 'Vostro'],
+    'HP': ['Pavilion', 'Envy', 'Spectre', 'Omen', 'EliteBook'],
+    'Lenovo': ['IdeaPad', 'ThinkPad', 'Legion', 'Yoga', 'ThinkBook'],
+    'ASUS': ['VivoBook', 'ZenBook', 'ROG Strix', 'TUF Gaming', 'ExpertBook'],
+    'Acer': ['Aspire', 'Swift', 'Nitro', 'Predator', 'TravelMate'],
+    'Apple': ['MacBook Air', 'MacBook Pro'],
+}
+SPEC_VALUES = {
+    'Processor': ['Intel Core i3', 'Intel Core i5', 'Intel Core i7', 'Intel Core i9',
+                  'AMD Ryzen 5', 'AMD Ryzen 7', 'AMD Ryzen 9', 'Apple M2', 'Apple M3'],
+    'RAM': ['8GB', '16GB', '32GB', '64GB'],
+    'Storage': ['256GB SSD', '512GB SSD', '1TB SSD', '2TB SSD'],
+    'Display': ['13.3" FHD', '14" FHD', '15.6" FHD', '15.6" QHD', '16" QHD', '17.3" FHD'],
+    'Graphics': ['Integrated', 'RTX 3050', 'RTX 4050', 'RTX 4060', 'RTX 4070'],
+}
+ACCESSORIES = ['Wireless Mouse', 'Mechanical Keyboard', 'Laptop Bag', 'USB-C Dock',
+               'Cooling Pad', 'Headset', '65W Charger', 'Webcam']
+ORDER_STATUSES = ['delivered'] * 6 + ['shipped', 'processing', 'confirmed', 'pending', 'cancelled']
+CITIES = [('Mumbai', 'Maharashtra', '400001'), ('Pune', 'Maharashtra', '411001'),
+          ('Bengaluru', 'Karnataka', '560001'), ('Chennai', 'Tamil Nadu', '600001'),
+          ('Delhi', 'Delhi', '110001'), ('Hyderabad', 'Telangana', '500001'),
+          ('Kolkata', 'West Bengal', '700001'), ('Ahmedabad', 'Gujarat', '380001')]
+# Values per IN (...) when looking generated rows up
+CHUNK_SIZE = 500
+
+
+def lookup(queryset, field, values, *columns):
+    """{value: row of `columns`} for the rows whose `field` is in `values`, queried in chunks"""
+    values = list(values)
+    rows = {}
+    for offset in range(0, len(values), CHUNK_SIZE):
+        chunk = values[offset:offset + CHUNK_SIZE]
+        for key, *row in queryset.filter(**{f'{field}__in': chunk}).values_list(field, *columns):
+            rows[key] = row
+    return rows
+
+
+def product_sku(index):
+    return f'{SKU_PREFIX}{index:08d}'
+
+
 class Command(BaseCommand):
     help = 'Populate database with sample data'
-    
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=0,
+                            help='Total generated products (re-runs top up to this number)')
+        parser.add_argument('--users', type=int, default=0,
+                            help='Total generated customers (re-runs top up to this number)')
+        parser.add_argument('--orders', type=int, default=0, help='Number of orders to add')
+        parser.add_argument('--carts', type=float, default=0.3,
+                            help='Share of new customers that get an open cart')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed, for reproducible data')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
     def handle(self, *args, **options):
         # Create admin user
         if not User.objects.filter(email='admin@example.com').exists():
@@ -20,15 +86,238 @@ class Command(BaseCommand):
                 is_superuser=True
             )
             self.stdout.write('Admin user created')
-        
+
         # Create categories
         categories = ['Laptops', 'Gaming Laptops', 'Accessories', 'Monitors']
         for cat_name in categories:
             Category.objects.get_or_create(name=cat_name)
-        
+
         # Create brands
         brands = ['Dell', 'HP', 'Lenovo', 'ASUS', 'Acer', 'Apple']
         for brand_name in brands:
             Brand.objects.get_or_create(name=brand_name)
-        
-        self.stdout.write('Sample data populated successfully!')
\ No newline at end of file
+
+        self.seed = options['seed']
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+
+        if options['products']:
+            self.generate_products(options['products'])
+        if options['users']:
+            self.generate_users(options['users'], options['carts'])
+        if options['orders']:
+            self.generate_orders(options['orders'])
+
+        self.stdout.write('Sample data populated successfully!')
+
+    def row_random(self, kind, index):
+        """
+        The random stream of the index-th generated row of a kind. Rows do
+        not share a stream, so a top-up run creates the same rows a single
+        run to the same total would have.
+        """
+        return random.Random(f'{self.seed}-{kind}-{index}')
+
+    def progress(self, label, done, total, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'{label}: {done}/{total} ({done / max(elapsed, 1e-9):.0f} rows/s)')
+
+    def backdate(self, model, objects, created_at):
+        """
+        bulk_create stamps auto_now_add fields with the current time; write
+        the generated times over it, one executemany per batch.
+        """
+        opts = model._meta
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'UPDATE {quote(opts.db_table)} SET {quote(opts.get_field("created_at").column)} = %s '
+                f'WHERE {quote(opts.pk.column)} = %s',
+                [(connection.ops.adapt_datetimefield_value(value), obj.pk) for obj, value in zip(objects, created_at)]
+            )
+        for obj, value in zip(objects, created_at):
+            obj.created_at = value
+
+    def generated_products(self):
+        return Product.objects.filter(sku__startswith=SKU_PREFIX)
+
+    def generated_customers(self):
+        return User.objects.filter(email__startswith='customer', email__endswith='@example.com')
+
+    def generate_products(self, count):
+        categories = dict(Category.objects.values_list('name', 'id'))
+        brands = dict(Brand.objects.values_list('name', 'id'))
+        # Rows from an earlier run with the same seed are kept, so re-runs top up
+        existing = self.generated_products().count()
+        start = time.perf_counter()
+
+        for offset in range(existing, count, self.batch_size):
+            products, specs, created_at = [], [], []
+            for i in range(offset, min(offset + self.batch_size, count)):
+                rng = self.row_random('product', i)
+                brand = rng.choice(list(PRODUCT_LINES))
+                is_accessory = rng.random() < 0.2
+                if is_accessory:
+                    name = f'{brand} {rng.choice(ACCESSORIES)}'
+                    category = 'Accessories'
+                    price = Decimal(rng.randrange(499, 15000, 100))
+                    product_specs = {}
+                else:
+                    line = rng.choice(PRODUCT_LINES[brand])
+                    product_specs = {spec: rng.choice(values) for spec, values in SPEC_VALUES.items()}
+                    gaming = product_specs['Graphics'] != 'Integrated'
+                    name = f"{brand} {line} {product_specs['Processor'].split()[-1]} {product_specs['RAM']}"
+                    category = 'Gaming Laptops' if gaming else 'Laptops'
+                    price = Decimal(rng.randrange(29990, 350000, 1000))
+
+                product = Product(
+                    name=name,
+                    description=f'{name}. ' + ', '.join(f'{k}: {v}' for k, v in product_specs.items()),
+                    short_description=', '.join(product_specs.values())[:500] or name,
+                    category_id=categories[category],
+                    brand_id=brands[brand],
+                    product_type='accessory' if is_accessory else 'laptop',
+                    sku=product_sku(i),
+                    price=price,
+                    discount_percentage=Decimal(rng.choice([0, 0, 0, 5, 10, 15, 20, 25])),
+                    stock_quantity=rng.choice([0, 2, 5, 10, 25, 50, 100, 250]),
+                    is_active=rng.random() > 0.03,
+                    is_featured=rng.random() < 0.005,
+                    warranty_months=rng.choice([6, 12, 12, 24, 36]),
+                )
+                product.set_effective_price()
+                products.append(product)
+                specs.append(product_specs)
+                created_at.append(self.now - timedelta(minutes=rng.randint(0, 3 * 525600)))
+
+            with transaction.atomic():
+                Product.objects.bulk_create(products)
+                self.backdate(Product, products, created_at)
+                ProductSpecification.objects.bulk_create([
+                    ProductSpecification(product_id=product.id, spec_name=name, spec_value=value)
+                    for product, product_specs in zip(products, specs)
+                    for name, value in product_specs.items()
+                ])
+                ProductImage.objects.bulk_create([
+                    ProductImage(product_id=product.id, image=f'products/sample-{product.sku}-{n}.jpg',
+                                 alt_text=product.name, is_primary=n == 0)
+                    for product in products for n in range(2)
+                ])
+            self.progress('Products', offset + len(products), count, start)
+
+        # Bulk inserts skip the catalog signals
+        bump_catalog_version()
+        self.stdout.write('Run rebuild_search_index, rebuild_facets and warm_featured_products '
+                          'to refresh derived catalog data')
+
+    def generate_users(self, count, cart_share):
+        # Hashing once keeps millions of users fast; they all share CUSTOMER_PASSWORD
+        password = make_password(CUSTOMER_PASSWORD)
+        existing = self.generated_customers().count()
+        product_count = self.generated_products().count()
+        start = time.perf_counter()
+
+        for offset in range(existing, count, self.batch_size):
+            users, carts = [], []
+            for i in range(offset, min(offset + self.batch_size, count)):
+                rng = self.row_random('user', i)
+                city, state, pincode = rng.choice(CITIES)
+                users.append(User(
+                    email=CUSTOMER_EMAIL.format(i), username=f'customer{i}', password=password,
+                    first_name=f'Customer{i}', phone=f'9{rng.randint(100000000, 999999999)}',
+                    city=city, state=state, pincode=pincode, address=f'{rng.randint(1, 999)} Main Road',
+                ))
+                if product_count and rng.random() < cart_share:
+                    picks = rng.sample(range(product_count), min(product_count, rng.randint(1, 4)))
+                    carts.append((users[-1], [(index, rng.randint(1, 3)) for index in picks]))
+
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                self.generate_carts(carts)
+            self.progress('Users', offset + len(users), count, start)
+
+    def generate_carts(self, carts):
+        """Open carts for [(user, [(product index, quantity)])], skipping inactive products"""
+        products = lookup(self.generated_products().filter(is_active=True), 'sku',
+                          {product_sku(index) for _, lines in carts for index, _ in lines}, 'id')
+        carts = [(Cart(user_id=user.id), [(products[product_sku(index)][0], quantity)
+                                          for index, quantity in lines if product_sku(index) in products])
+                 for user, lines in carts]
+        Cart.objects.bulk_create([cart for cart, _ in carts])
+        CartItem.objects.bulk_create([
+            CartItem(cart_id=cart.id, product_id=product_id, quantity=quantity)
+            for cart, lines in carts for product_id, quantity in lines
+        ])
+
+    def generate_orders(self, count):
+        product_count = self.generated_products().count()
+        customer_count = self.generated_customers().count()
+        if not product_count or not customer_count:
+            self.stdout.write('Orders need generated products and customers; skipping')
+            return
+        # Orders continue the numbering of earlier runs, so each run adds new ones
+        # (as long as generated rows are not deleted in between)
+        existing = Order.objects.filter(shipping_name='Sample Customer').count()
+        start = time.perf_counter()
+
+        for offset in range(0, count, self.batch_size):
+            drafts = []
+            for n in range(offset, min(offset + self.batch_size, count)):
+                rng = self.row_random('order', existing + n)
+                picks = rng.sample(range(product_count), min(product_count, rng.choice([1, 1, 1, 2, 2, 3, 5])))
+                status = rng.choice(ORDER_STATUSES)
+                paid = status not in ('pending', 'cancelled')
+                drafts.append(dict(
+                    order_id=uuid.UUID(int=rng.getrandbits(128), version=4),
+                    customer=CUSTOMER_EMAIL.format(rng.randrange(customer_count)),
+                    lines=[(product_sku(index), rng.randint(1, 2)) for index in picks],
+                    status=status,
+                    payment_status='paid' if paid else rng.choice(['pending', 'failed']),
+                    payment_method=rng.choice(['stripe', 'razorpay']) if paid else None,
+                    city=rng.choice(CITIES),
+                    created_at=self.now - timedelta(minutes=rng.randint(0, 2 * 525600)),
+                ))
+
+            # Past orders may hold products that have been deactivated since
+            products = lookup(self.generated_products(), 'sku',
+                              {sku for draft in drafts for sku, _ in draft['lines']}, 'id', 'name', 'effective_price')
+            customers = lookup(self.generated_customers(), 'email', {draft['customer'] for draft in drafts}, 'id')
+            orders, order_lines, created_at = [], [], []
+            for draft in drafts:
+                lines = [(products[sku], quantity) for sku, quantity in draft['lines'] if sku in products]
+                if not lines or draft['customer'] not in customers:
+                    continue
+                total = sum(price * quantity for (_, _, price), quantity in lines)
+                tax = (total * Decimal('0.18')).quantize(Decimal('0.01'))
+                shipping = 50 if total < 500 else 0
+                city, state, pincode = draft['city']
+                paid = draft['payment_status'] == 'paid'
+                orders.append(Order(
+                    order_id=draft['order_id'], user_id=customers[draft['customer']][0],
+                    total_amount=total, tax_amount=tax,
+                    shipping_charges=shipping, final_amount=total + tax + shipping,
+                    status=draft['status'], payment_status=draft['payment_status'],
+                    payment_method=draft['payment_method'],
+                    payment_transaction_id=f"sample_{draft['order_id'].hex}" if paid else None,
+                    shipping_name='Sample Customer', shipping_phone='9000000000',
+                    shipping_address='1 Main Road', shipping_city=city, shipping_state=state,
+                    shipping_pincode=pincode,
+                ))
+                order_lines.append(lines)
+                created_at.append(draft['created_at'])
+
+            with transaction.atomic():
+                Order.objects.bulk_create(orders)
+                self.backdate(Order, orders, created_at)
+                OrderItem.objects.bulk_create([
+                    OrderItem(order_id=order.id, product_id=product_id, product_name=name,
+                              product_price=price, quantity=quantity, total_price=price * quantity)
+                    for order, lines in zip(orders, order_lines)
+                    for (product_id, name, price), quantity in lines
+                ])
+                Payment.objects.bulk_create([
+                    Payment(order_id=order.id, amount=order.final_amount, payment_method=order.payment_method,
+                            transaction_id=order.payment_transaction_id, status='success')
+                    for order in orders if order.payment_status == 'paid'
+                ])
+            self.progress('Orders', offset + len(drafts), count, start)
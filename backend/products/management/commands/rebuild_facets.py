@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from products.facets import rebuild_facets
+from products.models import SpecificationFacet
+
+
+class Command(BaseCommand):
+    help = 'Recompute specification facet counts from scratch'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_facets()
+        self.stdout.write(f'Rebuilt {SpecificationFacet.objects.count()} facets')
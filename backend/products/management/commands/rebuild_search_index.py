@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from products.models import Product
+from products.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        if backend is None:
+            raise CommandError('The configured database has no full-text search backend')
+
+        batch_size = options['batch_size']
+        products = Product.objects.only('id', 'name', 'short_description', 'description').order_by('id')
+        indexed = 0
+
+        with transaction.atomic():
+            backend.clear()
+            batch = []
+            for product in products.iterator(chunk_size=batch_size):
+                batch.append(product)
+                if len(batch) >= batch_size:
+                    backend.index_products(batch)
+                    indexed += len(batch)
+                    batch = []
+            if batch:
+                backend.index_products(batch)
+                indexed += len(batch)
+
+        self.stdout.write(f'Indexed {indexed} products')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from products.cache import bump_catalog_version
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Recompute Product.effective_price for every product (after migrating or bulk edits)'
+
+    def handle(self, *args, **options):
+        updated = Product.objects.refresh_effective_price()
+        bump_catalog_version()
+        self.stdout.write(f'Updated {updated} products')
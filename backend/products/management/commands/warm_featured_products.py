@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from products.cache import build_featured_products
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the cached featured products payload (run after deploys)'
+
+    def handle(self, *args, **options):
+        data = build_featured_products()
+        self.stdout.write(f'Cached {len(data)} featured products')
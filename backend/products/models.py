@@ -1,4 +1,7 @@
+from decimal import Decimal
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Round
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -30,6 +33,23 @@ class Brand(models.Model):
     def __str__(self):
         return self.name
 
+class ProductQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Load everything ProductListSerializer needs in a fixed number of queries"""
+        return self.select_related('category', 'brand').prefetch_related(
+            models.Prefetch(
+                'images',
+                queryset=ProductImage.objects.filter(is_primary=True),
+                to_attr='primary_images'
+            )
+        )
+    
+    def refresh_effective_price(self):
+        """Recompute the stored effective_price in one UPDATE (for bulk writes that skip save())"""
+        return self.update(effective_price=Round(
+            F('price') - F('price') * F('discount_percentage') / 100, 2
+        ))
+
 class Product(models.Model):
     PRODUCT_TYPE_CHOICES = (
         ('laptop', 'Laptop'),
@@ -45,6 +65,8 @@ class Product(models.Model):
     sku = models.CharField(max_length=100, unique=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     discount_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    # Price after discount, kept in sync by save() so it can be filtered and sorted on
+    effective_price = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
     stock_quantity = models.PositiveIntegerField(default=0)
     min_stock_level = models.PositiveIntegerField(default=5)
     is_active = models.BooleanField(default=True)
@@ -54,13 +76,43 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ProductQuerySet.as_manager()
+    
     class Meta:
         db_table = 'products'
         ordering = ['-created_at']
+        # Access paths used by ProductListView and the admin dashboard. Partial on
+        # is_active (Django renders filter(is_active=True) as a bare boolean, which
+        # only a matching partial index can serve); MySQL ignores the condition.
+        indexes = [
+            models.Index(fields=['-created_at'], condition=models.Q(is_active=True),
+                         name='products_active_created_idx'),
+            models.Index(fields=['category', '-created_at'], condition=models.Q(is_active=True),
+                         name='products_active_cat_idx'),
+            models.Index(fields=['brand', '-created_at'], condition=models.Q(is_active=True),
+                         name='products_active_brand_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(is_active=True, is_featured=True),
+                         name='products_active_feat_idx'),
+            models.Index(fields=['effective_price'], condition=models.Q(is_active=True),
+                         name='products_active_price_idx'),
+            models.Index(fields=['stock_quantity'], name='products_stock_idx'),
+        ]
     
     def __str__(self):
         return self.name
     
+    def set_effective_price(self):
+        price = Decimal(str(self.price))
+        discount = Decimal(str(self.discount_percentage))
+        self.effective_price = (price - price * discount / 100).quantize(Decimal('0.01'))
+    
+    def save(self, *args, **kwargs):
+        self.set_effective_price()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'price', 'discount_percentage'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'effective_price'}
+        super().save(*args, **kwargs)
+    
     @property
     def discounted_price(self):
         if self.discount_percentage > 0:
@@ -94,4 +146,15 @@ class ProductSpecification(models.Model):
     
     class Meta:
         db_table = 'product_specifications'
-        unique_together = ['product', 'spec_name']
\ No newline at end of file
+        unique_together = ['product', 'spec_name']
+        indexes = [models.Index(fields=['spec_name', 'spec_value'])]
+
+class SpecificationFacet(models.Model):
+    """Number of active products per spec name/value, maintained by products.facets"""
+    spec_name = models.CharField(max_length=100)
+    spec_value = models.CharField(max_length=200)
+    product_count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'specification_facets'
+        unique_together = ['spec_name', 'spec_value']
\ No newline at end of file
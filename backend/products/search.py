@@ -0,0 +1,202 @@
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+SEARCH_TABLE = 'product_search'
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query):
+    return _TERM_RE.findall(query or '')[:10]
+
+
+class BaseSearchBackend:
+    """Keeps a full-text index of products next to the `products` table"""
+
+    def __init__(self):
+        self._schema_ready = False
+
+    def ensure_schema(self):
+        if not self._schema_ready:
+            with connection.cursor() as cursor:
+                for statement in self.schema_sql():
+                    cursor.execute(statement)
+            # Inside a transaction the tables only exist once it commits; a
+            # rollback drops them again, so the next call creates them again
+            transaction.on_commit(self.schema_created)
+
+    def schema_created(self):
+        self._schema_ready = True
+
+    def schema_sql(self):
+        raise NotImplementedError
+
+    def index_products(self, products):
+        raise NotImplementedError
+
+    def remove_product(self, product_id):
+        raise NotImplementedError
+
+    def clear(self):
+        self.ensure_schema()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    def match_sql(self, query):
+        """SQL selecting the ids of every matching product, and its params"""
+        raise NotImplementedError
+
+    def rank(self, queryset, query):
+        """Join `queryset` to its matches and annotate search_rank, lower is better"""
+        raise NotImplementedError
+
+    def id_column(self, queryset):
+        opts = queryset.model._meta
+        return f'{connection.ops.quote_name(opts.db_table)}.{connection.ops.quote_name(opts.pk.column)}'
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    def schema_sql(self):
+        return [
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+            'name, short_description, description, '
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+        ]
+
+    def index_products(self, products):
+        self.ensure_schema()
+        rows = [(p.id, p.name, p.short_description or '', p.description) for p in products]
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [(r[0],) for r in rows])
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, name, short_description, description) '
+                'VALUES (%s, %s, %s, %s)',
+                rows
+            )
+
+    def remove_product(self, product_id):
+        self.ensure_schema()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [product_id])
+
+    def match_expression(self, query):
+        # Every term must match; the last one as a prefix so search-as-you-type works
+        terms = search_terms(query)
+        match = ' '.join(f'"{t}"' for t in terms[:-1])
+        return f'{match} "{terms[-1]}"*'.strip()
+
+    def match_sql(self, query):
+        self.ensure_schema()
+        return f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [self.match_expression(query)]
+
+    def rank(self, queryset, query):
+        self.ensure_schema()
+        return queryset.extra(
+            tables=[SEARCH_TABLE],
+            where=[f'{SEARCH_TABLE} MATCH %s', f'{SEARCH_TABLE}.rowid = {self.id_column(queryset)}'],
+            params=[self.match_expression(query)],
+            # Column weights: name > short_description > description
+            select={'search_rank': f'bm25({SEARCH_TABLE}, 10.0, 4.0, 1.0)'},
+        )
+
+
+class PostgresBackend(BaseSearchBackend):
+    config = 'english'
+
+    def schema_sql(self):
+        return [
+            f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+            'product_id bigint PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE, '
+            'document tsvector NOT NULL)',
+            f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_gin '
+            f'ON {SEARCH_TABLE} USING GIN (document)',
+        ]
+
+    def index_products(self, products):
+        self.ensure_schema()
+        rows = [
+            (p.id, self.config, p.name, self.config, p.short_description or '', self.config, p.description)
+            for p in products
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (product_id, document) VALUES (%s, '
+                "setweight(to_tsvector(%s, %s), 'A') || "
+                "setweight(to_tsvector(%s, %s), 'B') || "
+                "setweight(to_tsvector(%s, %s), 'C')) "
+                'ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document',
+                rows
+            )
+
+    def remove_product(self, product_id):
+        self.ensure_schema()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE product_id = %s', [product_id])
+
+    def tsquery(self, query):
+        terms = search_terms(query)
+        return ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+
+    def match_sql(self, query):
+        self.ensure_schema()
+        return (
+            f'SELECT product_id FROM {SEARCH_TABLE} WHERE document @@ to_tsquery(%s, %s)',
+            [self.config, self.tsquery(query)]
+        )
+
+    def rank(self, queryset, query):
+        self.ensure_schema()
+        params = [self.config, self.tsquery(query)]
+        return queryset.extra(
+            tables=[SEARCH_TABLE],
+            where=['document @@ to_tsquery(%s, %s)', f'{SEARCH_TABLE}.product_id = {self.id_column(queryset)}'],
+            params=params,
+            select={'search_rank': '-ts_rank(document, to_tsquery(%s, %s))'},
+            select_params=params,
+        )
+
+
+_backend = None
+
+
+def get_search_backend():
+    """
+    Return the configured search backend, or None when the database has no
+    full-text support (callers then fall back to icontains filtering).
+    """
+    global _backend
+    if _backend is None:
+        backend_path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+        if backend_path:
+            _backend = import_string(backend_path)()
+        elif connection.vendor == 'sqlite':
+            _backend = SQLiteFTS5Backend()
+        elif connection.vendor == 'postgresql':
+            _backend = PostgresBackend()
+        else:
+            _backend = False
+    return _backend or None
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter that uses the full-text index. Every match is kept, so
+    ?ordering= and pagination see the whole result set; without ?ordering=
+    results are ordered by rank.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        backend = get_search_backend()
+        query = request.query_params.get(self.search_param, '')
+        if backend is None or not search_terms(query):
+            return super().filter_queryset(request, queryset, view)
+
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset.filter(pk__in=RawSQL(*backend.match_sql(query)))
+        return backend.rank(queryset, query).order_by('search_rank', 'pk')
@@ -35,7 +35,11 @@ class ProductListSerializer(serializers.ModelSerializer):
                  'is_featured', 'primary_image', 'warranty_months')
     
     def get_primary_image(self, obj):
-        primary_image = obj.images.filter(is_primary=True).first()
+        # Querysets built with Product.objects.for_listing() prefetch this
+        if hasattr(obj, 'primary_images'):
+            primary_image = obj.primary_images[0] if obj.primary_images else None
+        else:
+            primary_image = obj.images.filter(is_primary=True).first()
         if primary_image:
             return primary_image.image.url if primary_image.image else None
         return None
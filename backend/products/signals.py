@@ -0,0 +1,131 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import (bump_product_versions, bump_versions, featured_product_ids,
+                    schedule_featured_rebuild, version_key)
+from .facets import refresh_facets
+from .models import Brand, Category, Product, ProductImage, ProductSpecification
+from .search import get_search_backend
+
+
+# Fields shown in the featured payload (ProductListSerializer)
+FEATURED_FIELDS = ('is_featured', 'is_active', 'price', 'discount_percentage', 'name',
+                   'short_description', 'warranty_months', 'category_id', 'brand_id')
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_state(sender, instance, raw=False, **kwargs):
+    instance._previous_state = None
+    if instance.pk and not raw:
+        instance._previous_state = Product.objects.filter(pk=instance.pk).values(
+            *FEATURED_FIELDS, 'stock_quantity'
+        ).first()
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    backend = get_search_backend()
+    if backend is None or raw:
+        return
+    backend.index_products([instance])
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_facets(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_state', None)
+    if raw or created or previous is None or previous['is_active'] == instance.is_active:
+        return
+    refresh_facets(instance.specifications.values_list('spec_name', 'spec_value'))
+
+
+@receiver(post_save, sender=Product)
+def refresh_featured_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    if created or previous is None:
+        if instance.is_featured and instance.is_active:
+            schedule_featured_rebuild()
+        return
+    if not (previous['is_featured'] or instance.is_featured):
+        return
+    changed = any(previous[field] != getattr(instance, field) for field in FEATURED_FIELDS)
+    if changed or (previous['stock_quantity'] > 0) != instance.is_in_stock:
+        schedule_featured_rebuild()
+
+
+@receiver(post_delete, sender=Product)
+def refresh_featured_on_delete(sender, instance, **kwargs):
+    if instance.is_featured:
+        schedule_featured_rebuild()
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def refresh_featured_on_image(sender, instance, raw=False, **kwargs):
+    if not raw and instance.product_id in featured_product_ids():
+        schedule_featured_rebuild()
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Brand)
+def refresh_featured_on_rename(sender, instance, raw=False, **kwargs):
+    # Featured items show category_name and brand_name
+    if not raw:
+        schedule_featured_rebuild()
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    backend = get_search_backend()
+    if backend is not None:
+        backend.remove_product(instance.pk)
+
+
+@receiver(pre_save, sender=ProductSpecification)
+def remember_specification(sender, instance, raw=False, **kwargs):
+    instance._previous_facet = None
+    if instance.pk and not raw:
+        instance._previous_facet = ProductSpecification.objects.filter(pk=instance.pk).values_list(
+            'spec_name', 'spec_value'
+        ).first()
+
+
+@receiver(post_save, sender=ProductSpecification)
+def update_specification_facet(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pairs = [(instance.spec_name, instance.spec_value)]
+    if instance._previous_facet:
+        pairs.append(instance._previous_facet)
+    refresh_facets(pairs)
+
+
+@receiver(post_delete, sender=ProductSpecification)
+def remove_specification_facet(sender, instance, **kwargs):
+    refresh_facets([(instance.spec_name, instance.spec_value)])
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: bump_product_versions([instance.pk]))
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+@receiver([post_save, post_delete], sender=ProductSpecification)
+def invalidate_product_children(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: bump_product_versions([instance.product_id]))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: bump_versions([version_key('category', instance.pk)]))
+
+
+@receiver([post_save, post_delete], sender=Brand)
+def invalidate_brand(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: bump_versions([version_key('brand', instance.pk)]))
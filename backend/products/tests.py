@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .models import Brand, Category, Product, ProductImage
+
+
+class ProductListQueryTests(TestCase):
+    """The product list runs a fixed number of queries, however many products are on the page"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Laptops')
+        cls.brand = Brand.objects.create(name='Dell')
+        cls.user = get_user_model().objects.create_user(email='shopper@example.com', username='shopper',
+                                                        password=None)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_products(self, count):
+        for n in range(count):
+            sku = f'TEST-{Product.objects.count():04d}'
+            product = Product.objects.create(name=f'Laptop {sku}', description='A laptop', category=self.category,
+                                             brand=self.brand, sku=sku, price=50000)
+            ProductImage.objects.bulk_create([
+                ProductImage(product=product, image=f'products/{sku}-{i}.jpg', is_primary=i == 0) for i in range(2)
+            ])
+
+    def list_products(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('products:product-list'))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.add_products(1)
+        response, one_product = self.list_products()
+        self.assertEqual(len(response.data['results']), 1)
+
+        self.add_products(7)
+        # COUNT(*), the page with category and brand joined, the primary images, the facets
+        with self.assertNumQueries(4):
+            response, eight_products = self.list_products()
+        self.assertEqual(len(response.data['results']), 8)
+        self.assertEqual(eight_products, one_product)
+        self.assertTrue(all(item['primary_image'] for item in response.data['results']))
@@ -2,8 +2,15 @@ from rest_framework import generics, filters, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
 from django.db.models import Q
+from django.utils.http import parse_etags
+from utils.pagination import CatalogPagination
 from .models import Category, Brand, Product
+from .cache import (get_featured_products, get_versions, product_cache, product_detail_etag,
+                    product_detail_keys, product_detail_meta_key, product_detail_payload_key)
+from .facets import facet_counts, filter_by_specs
+from .search import ProductSearchFilter
 from .serializers import (CategorySerializer, BrandSerializer, ProductListSerializer, 
                          ProductDetailSerializer, ProductCreateUpdateSerializer)
 
@@ -16,31 +23,80 @@ class BrandListCreateView(generics.ListCreateAPIView):
     serializer_class = BrandSerializer
 
 class ProductListView(generics.ListAPIView):
-    queryset = Product.objects.filter(is_active=True)
+    queryset = Product.objects.filter(is_active=True).for_listing()
     serializer_class = ProductListSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = CatalogPagination
+    # Search runs last so it can order by relevance when no ?ordering= is given
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductSearchFilter]
     filterset_fields = ['category', 'brand', 'product_type', 'is_featured']
     search_fields = ['name', 'description', 'short_description']
-    ordering_fields = ['price', 'created_at', 'name']
+    ordering_fields = ['price', 'effective_price', 'created_at', 'name']
     ordering = ['-created_at']
     
     def get_queryset(self):
         queryset = super().get_queryset()
         
-        # Price range filtering
+        # Price range filtering, on the price after discount
         min_price = self.request.query_params.get('min_price')
         max_price = self.request.query_params.get('max_price')
         
         if min_price:
-            queryset = queryset.filter(price__gte=min_price)
+            queryset = queryset.filter(effective_price__gte=min_price)
         if max_price:
-            queryset = queryset.filter(price__lte=max_price)
+            queryset = queryset.filter(effective_price__lte=max_price)
+        
+        # Specification filters, e.g. ?spec_RAM=16GB&spec_Storage=512GB SSD
+        queryset = filter_by_specs(queryset, self.request.query_params)
         
         return queryset
+    
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if isinstance(response.data, dict):
+            response.data['facets'] = facet_counts()
+        return response
 
 class ProductDetailView(generics.RetrieveAPIView):
-    queryset = Product.objects.filter(is_active=True)
+    queryset = Product.objects.filter(is_active=True).select_related(
+        'category', 'brand').prefetch_related('images', 'specifications')
     serializer_class = ProductDetailSerializer
+    
+    def retrieve(self, request, *args, **kwargs):
+        # Responses are cached under an ETag derived from the version tokens of the
+        # product, its category and brand (bumped by products.signals), so a
+        # revalidation or a warm hit never reaches the product tables.
+        cache = product_cache()
+        pk = kwargs['pk']
+        host = request.get_host()
+        client_etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        
+        meta = cache.get(product_detail_meta_key(pk))
+        if meta:
+            etag = product_detail_etag(pk, host, get_versions(product_detail_keys(pk, meta)))
+            if etag in client_etags:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+            data = cache.get(product_detail_payload_key(etag))
+            if data is not None:
+                return Response(data, headers={'ETag': etag})
+        
+        # Read the versions before the rows so a concurrent change can only
+        # make this entry stale-on-arrival, never stale-forever
+        versions = get_versions(product_detail_keys(pk))
+        instance = self.get_object()
+        meta = {'category': instance.category_id, 'brand': instance.brand_id}
+        versions.update(get_versions([
+            key for key in product_detail_keys(pk, meta) if key not in versions
+        ]))
+        etag = product_detail_etag(pk, host, versions)
+        data = self.get_serializer(instance).data
+        
+        cache.set_many({
+            product_detail_meta_key(pk): meta,
+            product_detail_payload_key(etag): data,
+        }, settings.PRODUCT_CACHE_TIMEOUT)
+        if etag in client_etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response(data, headers={'ETag': etag})
 
 class ProductCreateView(generics.CreateAPIView):
     queryset = Product.objects.all()
@@ -52,6 +108,5 @@ class ProductUpdateView(generics.RetrieveUpdateDestroyAPIView):
 
 @api_view(['GET'])
 def featured_products(request):
-    products = Product.objects.filter(is_active=True, is_featured=True)[:8]
-    serializer = ProductListSerializer(products, many=True)
-    return Response(serializer.data)
\ No newline at end of file
+    # Precomputed by products.cache; rebuilt by signals when a featured product changes
+    return Response(get_featured_products())
\ No newline at end of file
@@ -4,6 +4,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
+from orders.cart_store import merge_anonymous_cart
 from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer
 
 User = get_user_model()
@@ -17,6 +18,7 @@ class UserRegistrationView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
+        merge_anonymous_cart(request, user)
         
         refresh = RefreshToken.for_user(user)
         return Response({
@@ -35,6 +37,7 @@ class UserLoginView(generics.GenericAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
+        merge_anonymous_cart(request, user)
         
         refresh = RefreshToken.for_user(user)
         return Response({
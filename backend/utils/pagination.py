@@ -0,0 +1,198 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator as DjangoPaginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination on (<ordering field>, id).
+
+    Each page is fetched with a WHERE on the last row seen instead of an
+    OFFSET, and no COUNT(*) is run, so page N costs the same as page 1. The
+    ordering field comes from the view's OrderingFilter (or `ordering`), so
+    it has to be one of the view's `ordering_fields`.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    ordering = '-created_at'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.field, self.descending = self.get_ordering(request, queryset, view)
+        cursor = self.decode_cursor(request)
+        backwards = bool(cursor and cursor.get('b'))
+
+        # Walking backwards means seeking in the opposite direction
+        descending = self.descending != backwards
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')
+
+        if cursor:
+            lookup = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}': cursor['v']}) |
+                Q(**{self.field: cursor['v'], f'id__{lookup}': cursor['id']})
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if backwards:
+            self.page.reverse()
+
+        self.has_next = has_more if not backwards else True
+        self.has_previous = bool(cursor) if not backwards else has_more
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        ordering = ordering or getattr(view, 'ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            ordering = [ordering]
+
+        field = ordering[0]
+        if '__' in field:
+            raise NotFound('Keyset pagination does not support related-field ordering')
+        return field.lstrip('-'), field.startswith('-')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            if cursor['f'] != self.field:
+                raise ValueError
+            return cursor
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance, backwards):
+        value = getattr(instance, self.field)
+        value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        cursor = {'f': self.field, 'v': value, 'id': instance.pk}
+        if backwards:
+            cursor['b'] = 1
+        encoded = urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode()).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], backwards=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], backwards=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+
+class ApproximateCountPaginator(DjangoPaginator):
+    """
+    Counts at most `count_cap` + 1 rows so the total never needs a full
+    scan. Past the cap `count` is only a lower bound (`is_capped`).
+    """
+    count_cap = 10000
+
+    @cached_property
+    def count(self):
+        return self.object_list[:self.count_cap + 1].count()
+
+    @property
+    def is_capped(self):
+        return self.count > self.count_cap
+
+    def validate_number(self, number):
+        if not self.is_capped:
+            return super().validate_number(number)
+        # The real page count is unknown past the cap, so only the lower bound is checked
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        if not self.is_capped:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+
+class CatalogPagination(PageNumberPagination):
+    """
+    Page numbers by default, with two opt-in modes:
+
+    - ?pagination=cursor (or any ?cursor=) switches to KeysetPagination.
+    - ?count=approx keeps page numbers but caps the COUNT(*). The response
+      has `count_at_least` and `count_capped` instead of `count`: the
+      exact total when `count_capped` is false, a lower bound when true.
+    """
+    mode_query_param = 'pagination'
+    count_query_param = 'count'
+    default_mode = 'page'
+    keyset_class = KeysetPagination
+
+    def use_keyset(self, request):
+        if request.query_params.get(self.keyset_class.cursor_query_param):
+            return True
+        return request.query_params.get(self.mode_query_param, self.default_mode) == 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request):
+            self.keyset = self.keyset_class()
+            self.keyset.page_size = self.get_page_size(request)
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        if request.query_params.get(self.count_query_param) == 'approx':
+            self.django_paginator_class = ApproximateCountPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+
+        response = super().get_paginated_response(data)
+        paginator = self.page.paginator
+        if isinstance(paginator, ApproximateCountPaginator):
+            data = response.data
+            response.data = OrderedDict([
+                ('count_at_least', data.pop('count')),
+                ('count_capped', paginator.is_capped),
+                *data.items(),
+            ])
+        return response
+
+    def get_next_link(self):
+        paginator = self.page.paginator
+        if isinstance(paginator, ApproximateCountPaginator) and paginator.is_capped:
+            if len(self.page) < paginator.per_page:
+                return None
+            url = self.request.build_absolute_uri()
+            return replace_query_param(url, self.page_query_param, self.page.number + 1)
+        return super().get_next_link()